@@ -1,13 +1,20 @@
+import time
+import uuid
 import streamlit as st
 import numpy as np
-import sounddevice as sd
-from scipy.signal import resample
 
 # Import from our modules
-from signal_generation import generate_signal
-from plotting import plot_signal
+from signal_generation import generate_signal, waveform_names, Generator, WAVEFORMS
+from plotting import plot_signal, plot_bank, plot_spectrum
 from signal_class import Signal
+from bank import SignalBank
+from importer import load_signal
 import ui # Our UI module
+import audio
+import tracing
+import jobs
+from cache import RESULT_CACHE, make_key
+from store import SIGNAL_STORE
 
 # --- Page Configuration & Styling ---
 st.set_page_config(
@@ -17,20 +24,178 @@ st.set_page_config(
 )
 ui.apply_custom_styling()
 
+# --- Per-Rerun Tracing (no-op unless WAVESCALER_TRACE is set or the URL has ?debug=1) ---
+if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex
+tracing.begin_rerun(enabled=tracing.ENABLED or st.query_params.get('debug') == '1', session=st.session_state.session_id)
+
 # --- Audio Hardware Query ---
-try:
-    DEFAULT_SAMPLERATE = int(sd.query_devices(sd.default.device[1], 'output')['default_samplerate'])
-except Exception:
-    DEFAULT_SAMPLERATE = 44100
+# Queried once per process, not on every rerun; set WAVESCALER_HEADLESS=1 on servers without audio
+DEFAULT_SAMPLERATE = audio.default_samplerate()
+
+# --- Audio Playback ---
+def stop_audio():
+    """Stops this session's streaming player, if any."""
+    player = st.session_state.get('player')
+    if player is not None:
+        player.stop()
+        st.session_state.player = None
+
+def start_audio(signal_obj):
+    """Starts looping the signal through a streaming player; blocks are rendered on demand."""
+    stop_audio()
+    st.session_state.player = audio.StreamingPlayer(signal_obj, DEFAULT_SAMPLERATE).start()
+
+def prepare_audio(signal_obj):
+    """Computes the statistics the player normalizes with, so starting it is instant."""
+    signal_obj.calculate_stats()
+    return signal_obj
+
+def request_playback(name, signal_obj, flag):
+    """Prepares the signal for playback in the background; finish_job starts the player and sets `flag`."""
+    stop_audio()
+    st.session_state.playing_original = st.session_state.playing_scaled = False
+    start_job(('play', name, st.session_state.get(f'{name}_handle')), "Preparing audio", lambda: prepare_audio(signal_obj), flag=flag)
+
+# --- Background Jobs ---
+# Scaling and audio preparation run on the jobs thread pool while the page polls for progress.
+# A session has at most one job: a new request or a parameter change cancels the one in flight,
+# and a finished result is only applied if the signal it was computed from is still current.
+POLL_SECONDS = 0.3
+
+def cancel_job():
+    """Cancels this session's in-flight job, if any."""
+    job = st.session_state.get('job')
+    if job is not None:
+        job.cancel()
+        st.session_state.job = None
+
+def start_job(key, label, compute, **context):
+    """Submits `compute` as this session's job, superseding any job in flight. `key` is (kind, signal name, handle)."""
+    cancel_job()
+    st.session_state.job = jobs.submit(key, compute, label, context)
+
+def finish_job():
+    """Applies this session's job once it has finished, if it still matches the session's signals."""
+    job = st.session_state.get('job')
+    if job is None or not job.done:
+        return
+    st.session_state.job = None
+    kind, name, handle = job.key
+    if st.session_state.get(f'{name}_handle') != handle:
+        return # The signal changed while the job ran
+    try:
+        result = job.result()
+    except jobs.Cancelled:
+        return
+    except Exception as e:
+        st.error(f"{job.label} failed: {e}")
+        return
+    # The work ran off the script thread, so its span is recorded from the job's own timing
+    tracing.record(f'job/{kind}', job.seconds, signal=name, n=tracing.array_size(result.x))
+    if kind == 'scale':
+        st.session_state.scaling_history = job.context['scaling_history']
+        set_session_handle('current', share_signal(result, job.context['content_key']))
+    elif kind == 'play':
+        try:
+            with tracing.span('start_audio', signal=name):
+                start_audio(result)
+            st.session_state[job.context['flag']] = True
+        except Exception as e: st.error(f"Audio Error: {e}")
 
 # --- App State Management Callback ---
 def signal_param_changed():
     """Flags that a signal generation parameter has changed."""
     st.session_state.params_changed = True
-    sd.stop()
+    cancel_job()
+    stop_audio()
     st.session_state.playing_original = False
     st.session_state.playing_scaled = False
 
+# --- Session Signals ---
+# The session keeps only handles into SIGNAL_STORE, which holds each distinct signal once
+# across sessions and spills idle sessions' arrays to disk under a global memory budget.
+SIGNAL_NAMES = ('original', 'current')
+
+def session_signal(name):
+    """Returns the session's 'original' or 'current' signal, or None."""
+    handle = st.session_state.get(f'{name}_handle')
+    return None if handle is None else SIGNAL_STORE.get(handle, st.session_state.session_id)
+
+def set_session_handle(name, handle):
+    """Makes a stored signal's handle (or None) the session's 'original' or 'current' one, releasing the one it replaces."""
+    previous = st.session_state.get(f'{name}_handle')
+    st.session_state[f'{name}_handle'] = handle
+    # Both names often share one handle (e.g. before any scaling), so only release it once neither does
+    if previous is not None and previous not in [st.session_state.get(f'{n}_handle') for n in SIGNAL_NAMES]:
+        SIGNAL_STORE.release(previous, st.session_state.session_id)
+
+def share_signal(signal_obj, content_key=None):
+    """Stores a signal for this session and returns its handle, recording it in RESULT_CACHE under `content_key`."""
+    handle = SIGNAL_STORE.put(signal_obj, st.session_state.session_id)
+    if content_key is not None:
+        RESULT_CACHE.put(('signal', content_key), handle)
+    return handle
+
+def shared_handle(content_key):
+    """Returns the handle of a stored signal with `content_key` and references it for this session, or None."""
+    handle = None if content_key is None else RESULT_CACHE.get(('signal', content_key))
+    if handle is None or SIGNAL_STORE.get(handle, st.session_state.session_id) is None:
+        return None # Never computed, or every session holding it has released it
+    return handle
+
+# --- Cached Results ---
+# Signals are shared across reruns and sessions through RESULT_CACHE, which maps the generation
+# parameters plus the scaling history to a SIGNAL_STORE handle; the arrays themselves stay in
+# the store, under its memory budget. Figures are cached by the same key. Uploaded signals have no key.
+def build_signal(sig_type, signal_args):
+    """Generates the original signal, or returns None if the parameters are invalid."""
+    with tracing.span('generate_signal', sig_type=sig_type) as generate_span:
+        t_orig, x_orig, is_discrete_orig = generate_signal(sig_type, **signal_args)
+        generate_span.set(n=tracing.array_size(x_orig))
+    if t_orig is None:
+        return None
+    # Audio-rate signals are stored as float32 with an implicit time axis to keep session memory small;
+    # generated waveforms keep their closed form so scaling can re-synthesize them exactly
+    generator = Generator(sig_type, signal_args['A'], signal_args['f'], signal_args['phi']) if sig_type in WAVEFORMS else None
+    return Signal(t=t_orig, x=x_orig, is_discrete=is_discrete_orig, f=signal_args.get('f'), Fs=signal_args.get('Fs'),
+                  lazy=True, compact=True, dtype=np.float32 if is_discrete_orig else float, generator=generator)
+
+def scaled_key(scaling_history=None):
+    """Content key of the current (scaled) signal, or of the one `scaling_history` leads to; None for uploaded signals."""
+    if st.session_state.get('signal_key') is None:
+        return None
+    return make_key(st.session_state.signal_key, st.session_state.get('scaling_history', []) if scaling_history is None else scaling_history)
+
+def cached_figure(signal_obj, content_key, view_range):
+    """Builds the plot for a signal, reusing a cached figure for the same content and view."""
+    if content_key is None:
+        return plot_signal(signal_obj, "", x_range=view_range)
+    return RESULT_CACHE.get_or_compute(('figure', content_key, view_range), lambda: plot_signal(signal_obj, "", x_range=view_range))
+
+def cached_spectrum_figure(signal_obj, content_key):
+    """Builds the spectrum plot for a signal; the spectrum itself is cached on the signal."""
+    if content_key is None:
+        return plot_spectrum(signal_obj, "")
+    return RESULT_CACHE.get_or_compute(('spectrum', content_key), lambda: plot_spectrum(signal_obj, ""))
+
+def render_spectrum(signal_obj, content_key, key_prefix):
+    """Shows the signal's magnitude/phase spectrum under its time plot when toggled on."""
+    if st.toggle("Show spectrum", key=f"{key_prefix}_show_spectrum"):
+        with tracing.span('plot_spectrum', chart=key_prefix, n=len(signal_obj.x)):
+            st.plotly_chart(cached_spectrum_figure(signal_obj, content_key), use_container_width=True, key=f"{key_prefix}_spectrum_chart")
+        spectrum = signal_obj.spectrum()
+        if spectrum is not None:
+            detail = f"averaged over {spectrum.blocks} overlapping blocks" if spectrum.blocks > 1 else f"{spectrum.n_fft}-point FFT"
+            st.caption(f"Peak at {spectrum.peak_frequency():.4g} Hz · {detail}")
+
+def sweep_bank(signal_obj, kind, factors):
+    """Fans the signal out into a SignalBank with one row per sweep factor."""
+    bank = SignalBank.from_signal(signal_obj)
+    return bank.scale_time(factors) if kind == "Time factor" else bank.scale_amplitude(factors)
+
+# Apply a job that finished since the last rerun before anything is drawn
+finish_job()
+
 # --- Main UI Rendering ---
 st.markdown("""
     <h1>
@@ -38,10 +203,11 @@ st.markdown("""
         <span class="title-sub">Interactive Tool for Time and Amplitude Scaling of Signals</span>
     </h1>
 """, unsafe_allow_html=True)
+job_status = st.empty() # Progress of the session's background job, filled in at the end of the script
 
 sig_type = st.selectbox(
     "Select which wave",
-    ['Sine', 'Cosine', 'Exponential', 'Triangular', 'Sawtooth', 'Sampled Sine', 'Sampled Cosine', 'Sampled Exponential', 'Sampled Triangular', 'Sampled Sawtooth', 'Custom Continuous', 'Custom Discrete'],
+    waveform_names(),
     key='sig_type',
     on_change=signal_param_changed,
     label_visibility="collapsed"
@@ -54,97 +220,159 @@ with st.container():
     
     st.write("### Visualization & Properties")
     plot_col_orig, params_col_orig = st.columns([2, 1])
-    original_signal = st.session_state.get('original_signal')
+    original_signal = session_signal('original')
     
     with plot_col_orig:
         if original_signal:
-            st.plotly_chart(plot_signal(original_signal, ""), use_container_width=True, key="original_chart")
+            chart = st.empty()
+            view_range = ui.render_view_window(original_signal, "original")
+            with tracing.span('plot_signal', chart="original", n=len(original_signal.x)):
+                chart.plotly_chart(cached_figure(original_signal, st.session_state.get('signal_key'), view_range), use_container_width=True, key="original_chart")
+            render_spectrum(original_signal, st.session_state.get('signal_key'), "original")
 
     with params_col_orig:
         if original_signal:
-            ui.display_signal_properties(original_signal)
+            with tracing.span('calculate_stats', signal="original"):
+                ui.display_signal_properties(original_signal)
             st.write("") 
             if original_signal.is_discrete:
                 if st.session_state.get('playing_original', False):
                     if st.button("⏹️ Stop Audio", key="stop_orig", use_container_width=True, type="secondary"):
-                        sd.stop(); st.session_state.playing_original = False; st.rerun()
+                        stop_audio(); st.session_state.playing_original = False; st.rerun()
                 else:
                     if st.button("▶️ Play in Loop", key="play_orig", use_container_width=True, type="primary"):
-                        try:
-                            sd.stop(); st.session_state.playing_scaled = False
-                            audio_float = original_signal.x.astype(np.float32)
-                            max_val = np.max(np.abs(audio_float)) 
-                            if max_val > 0: audio_float /= max_val
-                            source_fs = int(original_signal.Fs)
-                            if source_fs != DEFAULT_SAMPLERATE: audio_float = resample(audio_float, int(len(audio_float) * DEFAULT_SAMPLERATE / source_fs))
-                            audio_int16 = (audio_float * 32767).astype(np.int16)
-                            sd.play(audio_int16, samplerate=DEFAULT_SAMPLERATE, loop=True)
-                            st.session_state.playing_original = True; st.rerun()
-                        except Exception as e: st.error(f"Audio Error: {e}")
-            ui.get_download_links(original_signal, "original")
+                        request_playback('original', original_signal, 'playing_original'); st.rerun()
+            with tracing.span('export_links', signal="original"): ui.get_download_links(original_signal, "original", DEFAULT_SAMPLERATE)
 
 # --- Scaling Operations Section ---
 st.markdown("## Scaling Operations")
 with st.container():
     scaling_ops = ui.render_scaling_options_and_buttons()
+    # While the scaled signal plays, the pending factors are previewed live on the next audio block
+    if st.session_state.get('playing_scaled', False) and st.session_state.get('player') is not None:
+        st.session_state.player.set_params(scaling_ops['amp_scale_factor'], scaling_ops['time_scale_factor'])
     
     st.write("### Visualization & Properties")
     plot_col_scaled, params_col_scaled = st.columns([2, 1])
-    current_signal = st.session_state.get('current_signal')
+    current_signal = session_signal('current')
 
     with plot_col_scaled:
         if current_signal:
-            st.plotly_chart(plot_signal(current_signal, ""), use_container_width=True, key="scaled_chart")
+            chart = st.empty()
+            view_range = ui.render_view_window(current_signal, "scaled")
+            with tracing.span('plot_signal', chart="scaled", n=len(current_signal.x)):
+                chart.plotly_chart(cached_figure(current_signal, scaled_key(), view_range), use_container_width=True, key="scaled_chart")
+            render_spectrum(current_signal, scaled_key(), "scaled")
 
     with params_col_scaled:
         if current_signal:
-            ui.display_signal_properties(current_signal)
+            with tracing.span('calculate_stats', signal="scaled"):
+                ui.display_signal_properties(current_signal)
             st.write("") 
             if current_signal.is_discrete:
                 if st.session_state.get('playing_scaled', False):
                     if st.button("⏹️ Stop Audio", key="stop_scaled", use_container_width=True, type="secondary"):
-                        sd.stop(); st.session_state.playing_scaled = False; st.rerun()
+                        stop_audio(); st.session_state.playing_scaled = False; st.rerun()
                 else:
                     if st.button("▶️ Play in Loop", key="play_scaled", use_container_width=True, type="primary"):
-                        try:
-                            sd.stop(); st.session_state.playing_original = False
-                            audio_float = current_signal.x.astype(np.float32)
-                            max_val = np.max(np.abs(audio_float))
-                            if max_val > 0: audio_float /= max_val
-                            source_fs = int(current_signal.Fs)
-                            if source_fs != DEFAULT_SAMPLERATE: audio_float = resample(audio_float, int(len(audio_float) * DEFAULT_SAMPLERATE / source_fs))
-                            audio_int16 = (audio_float * 32767).astype(np.int16)
-                            sd.play(audio_int16, samplerate=DEFAULT_SAMPLERATE, loop=True)
-                            st.session_state.playing_scaled = True; st.rerun()
-                        except Exception as e: st.error(f"Audio Error: {e}")
-            ui.get_download_links(current_signal, "scaled")
+                        request_playback('current', current_signal, 'playing_scaled'); st.rerun()
+            with tracing.span('export_links', signal="scaled"): ui.get_download_links(current_signal, "scaled", DEFAULT_SAMPLERATE)
+
+# --- Parameter Sweep Section ---
+# Overlays the current signal at several scaling factors, computed as one batched SignalBank operation
+with st.expander("Parameter Sweep"):
+    sweep = ui.render_sweep_options()
+    current_signal = session_signal('current')
+    if sweep is not None and current_signal:
+        try:
+            with tracing.span('sweep', kind=sweep[0], rows=len(sweep[1])):
+                content_key = scaled_key()
+                build = lambda: sweep_bank(current_signal, *sweep)
+                bank = build() if content_key is None else RESULT_CACHE.get_or_compute(('sweep', content_key, sweep), build)
+                st.plotly_chart(plot_bank(bank, ""), use_container_width=True, key="sweep_chart")
+            ui.display_bank_stats(bank)
+        except ValueError as e: st.error(f"Sweep Error: {e}")
 
 # --- App State Logic (runs invisibly) ---
 if 'playing_original' not in st.session_state: st.session_state.playing_original = False
 if 'playing_scaled' not in st.session_state: st.session_state.playing_scaled = False
 
-if 'original_signal' not in st.session_state or st.session_state.get('params_changed', False):
+# A handle the store has dropped (the session sat idle past its expiry) is regenerated too
+original_handle = st.session_state.get('original_handle')
+if ('original_handle' not in st.session_state or st.session_state.get('params_changed', False)
+        or (original_handle is not None and original_handle not in SIGNAL_STORE)):
     signal_args = {k: v for k, v in gen_params.items() if not k.endswith('_s')}
-    t_orig, x_orig, is_discrete_orig = generate_signal(sig_type, **signal_args)
-    
-    if t_orig is not None:
-        st.session_state.original_signal = Signal(t=t_orig, x=x_orig, is_discrete=is_discrete_orig, f=signal_args.get('f'), Fs=signal_args.get('Fs'))
-        st.session_state.current_signal = st.session_state.original_signal.copy()
-    elif 'original_signal' in st.session_state:
-        st.session_state.original_signal, st.session_state.current_signal = None, None
+    upload = signal_args.pop('upload', None)
+    loaded_handle = None
+    if upload is not None:
+        st.session_state.signal_key = None
+        try:
+            # Uploaded samples are wrapped in place rather than copied
+            with tracing.span('load_signal'):
+                loaded_signal = load_signal(upload, Fs=signal_args.get('Fs'), is_discrete=(sig_type == 'Custom Discrete'), lazy=True)
+            loaded_handle = share_signal(loaded_signal)
+        except ValueError as e: st.error(f"Import Error: {e}")
+    else:
+        st.session_state.signal_key = make_key(sig_type, signal_args)
+        loaded_handle = shared_handle(st.session_state.signal_key)
+        if loaded_handle is None:
+            loaded_signal = build_signal(sig_type, signal_args)
+            if loaded_signal is not None:
+                loaded_handle = share_signal(loaded_signal, st.session_state.signal_key)
+
+    if loaded_handle is not None:
+        set_session_handle('original', loaded_handle)
+        set_session_handle('current', loaded_handle) # Unscaled, the current signal is the original
+        st.session_state.scaling_history = []
+    elif 'original_handle' in st.session_state:
+        set_session_handle('original', None); set_session_handle('current', None)
     st.session_state.params_changed = False
 
 if scaling_ops['reset_button']:
-    sd.stop(); st.session_state.playing_original, st.session_state.playing_scaled = False, False
-    if st.session_state.original_signal:
-        st.session_state.current_signal = st.session_state.original_signal.copy()
+    cancel_job(); stop_audio(); st.session_state.playing_original, st.session_state.playing_scaled = False, False
+    if st.session_state.get('original_handle') is not None:
+        set_session_handle('current', st.session_state.original_handle)
+        st.session_state.scaling_history = []
     st.rerun()
 
 if scaling_ops['apply_button']:
-    sd.stop(); st.session_state.playing_original, st.session_state.playing_scaled = False, False
-    if st.session_state.current_signal:
+    stop_audio(); st.session_state.playing_original, st.session_state.playing_scaled = False, False
+    original_signal = session_signal('original')
+    if original_signal:
         # THE FIX IS HERE: Use 'time_scale_factor' to match the key from ui.py
-        scaled_signal = st.session_state.current_signal.scale_amplitude(scaling_ops['amp_scale_factor']).scale_time(scaling_ops['time_scale_factor'])
-        st.session_state.current_signal = scaled_signal
+        scaling_history = st.session_state.get('scaling_history', []) + [
+            (scaling_ops['amp_scale_factor'], scaling_ops['time_scale_factor'], scaling_ops['resample_mode'])]
+        def apply_scaling(signal_obj=original_signal):
+            # The whole history is replayed on the lazy original, which fuses it into one resample,
+            # so repeated applies never resample an already resampled signal
+            for amp_factor, time_factor, mode in scaling_history:
+                signal_obj = signal_obj.scale_amplitude(amp_factor).scale_time(time_factor, mode)
+            signal_obj.fingerprint() # Materialize and hash in the worker, so the cache and store get the finished arrays
+            return signal_obj
+        current_key = scaled_key(scaling_history)
+        cached_handle = shared_handle(current_key)
+        if cached_handle is not None: # Another rerun or session already computed it
+            cancel_job()
+            st.session_state.scaling_history = scaling_history
+            set_session_handle('current', cached_handle)
+        else:
+            # Runs in the background; finish_job stores the result and installs it with the new history
+            start_job(('scale', 'current', st.session_state.current_handle), "Applying scaling", apply_scaling,
+                      scaling_history=scaling_history, content_key=current_key)
+        # The factors are now part of the current signal; resetting the controls keeps the live preview from applying them twice
+        st.session_state.reset_scaling_controls = True
     st.rerun()
 
+# --- Debug Timing Panel ---
+trace = tracing.end_rerun()
+if trace:
+    ui.render_debug_panel(trace, SIGNAL_STORE.usage(), RESULT_CACHE.usage())
+
+# --- Background Job Progress ---
+# Poll while a job runs; the rerun after it finishes applies the result through finish_job
+job = st.session_state.get('job')
+if job is not None:
+    job_status.progress(job.progress, text=f"{job.label}…")
+    if not job.done:
+        time.sleep(POLL_SECONDS)
+    st.rerun()
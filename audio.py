@@ -0,0 +1,171 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+import numpy as np
+
+# This file contains the shared audio rendering used by playback and WAV export.
+# sounddevice and scipy are imported on first use, so importing this module stays cheap.
+
+FALLBACK_SAMPLERATE = 44100 # Used when there is no output device, e.g. on a headless server
+HEADLESS = os.environ.get('WAVESCALER_HEADLESS', '') not in ('', '0') # Skip the device query altogether
+_device_samplerate = None
+_device_lock = threading.Lock()
+
+def default_samplerate():
+    """
+    Returns the default output device's sampling rate, or FALLBACK_SAMPLERATE without one.
+    The device is queried once per process, so Streamlit reruns do not repeat the query.
+    """
+    global _device_samplerate
+    with _device_lock:
+        if _device_samplerate is None:
+            _device_samplerate = FALLBACK_SAMPLERATE
+            if not HEADLESS:
+                try:
+                    import sounddevice as sd
+                    _device_samplerate = int(sd.query_devices(sd.default.device[1], 'output')['default_samplerate'])
+                except Exception: # No PortAudio library, or no output device
+                    pass
+        return _device_samplerate
+
+RENDER_CACHE_ENTRIES = 8 # Rendered buffers kept per process, most recently used first
+_render_cache = OrderedDict()
+_render_lock = threading.Lock() # Renders run on job threads and download requests concurrently
+
+def render_int16(signal_obj, target_fs):
+    """
+    Returns the signal normalized to full scale, resampled to `target_fs` with a rational
+    polyphase filter (e.g. 16000 -> 44100 is 441/160) and converted to int16.
+    Buffers are memoized per (signal fingerprint, target rate) and returned read-only.
+    """
+    key = (signal_obj.fingerprint(), int(target_fs))
+    with _render_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+
+    audio_float = signal_obj.x.astype(np.float32)
+    source_fs = int(signal_obj.Fs)
+    if source_fs != int(target_fs):
+        from scipy.signal import resample_poly
+        ratio = Fraction(int(target_fs), source_fs)
+        audio_float = resample_poly(audio_float, ratio.numerator, ratio.denominator)
+
+    # Normalize after resampling so filter overshoot cannot wrap around in int16
+    max_val = np.max(np.abs(audio_float)) if len(audio_float) else 0
+    if max_val > 0: audio_float *= 32767 / max_val
+    audio_int16 = np.clip(audio_float, -32768, 32767).astype(np.int16)
+    audio_int16.flags.writeable = False
+
+    # The lock is not held while rendering; a render finished twice concurrently is stored once
+    with _render_lock:
+        _render_cache[key] = audio_int16
+        while len(_render_cache) > RENDER_CACHE_ENTRIES:
+            _render_cache.popitem(last=False)
+    return audio_int16
+
+def clear_render_cache():
+    """Drops every memoized render."""
+    with _render_lock:
+        _render_cache.clear()
+
+def wav_bytes(signal_obj, target_fs):
+    """Returns a mono 16-bit WAV file of the signal, built from the cached render."""
+    from scipy.io import wavfile
+    buffer = io.BytesIO()
+    wavfile.write(buffer, int(target_fs), render_int16(signal_obj, target_fs))
+    return buffer.getvalue()
+
+class StreamingPlayer:
+    """
+    Loops a signal through an output-stream callback, rendering one block at a time.
+    The samples are read as a ring buffer by a fractional read head: each block is resampled
+    to the device rate with linear interpolation and scaled on the fly, so amplitude and
+    time-factor changes are heard from the next block and memory use does not depend on
+    the signal length. `stream_factory` defaults to sounddevice.OutputStream and can be
+    replaced by a fake stream for testing without audio hardware.
+    """
+    def __init__(self, signal_obj, samplerate, blocksize=1024, stream_factory=None):
+        self.samples = signal_obj.x
+        self.source_fs = float(signal_obj.Fs)
+        self.samplerate = int(samplerate)
+        self.blocksize = blocksize
+        self.amplitude = 1.0
+        self.time_factor = 1.0
+        self.position = 0.0 # Read head, in source samples
+
+        # Normalize to full scale using the signal's cached statistics
+        stats = signal_obj.calculate_stats()
+        peak = max(abs(stats['Max']), abs(stats['Min'])) if stats['Max'] is not None else 0.0
+        self.gain = 1.0 / peak if peak > 0 else 0.0
+
+        self._stream_factory = stream_factory
+        self._stream = None
+        self._offsets = np.arange(blocksize, dtype=float)
+        self._index = np.empty(blocksize, dtype=np.int64)
+        self._frac = np.empty(blocksize)
+
+    def set_params(self, amplitude=None, time_factor=None):
+        """Changes the scaling applied to the next rendered block; amplitudes above 1 play at full scale."""
+        if amplitude is not None: self.amplitude = float(amplitude)
+        if time_factor is not None: self.time_factor = float(time_factor)
+
+    def render_block(self, out):
+        """Fills `out` with the next len(out) output samples and advances the read head."""
+        frames, n = len(out), len(self.samples)
+        if n == 0:
+            out[:] = 0
+            return out
+        if frames > len(self._offsets):
+            self._offsets = np.arange(frames, dtype=float)
+            self._index, self._frac = np.empty(frames, dtype=np.int64), np.empty(frames)
+
+        step = self.time_factor * self.source_fs / self.samplerate
+        pos = self._frac[:frames]
+        np.multiply(self._offsets[:frames], step, out=pos)
+        pos += self.position
+        np.mod(pos, n, out=pos)
+        index = self._index[:frames]
+        index[:] = pos # Truncates towards zero; pos is non-negative
+        pos -= index # Fractional part
+
+        # Linear interpolation between each sample and the next, wrapping at the end
+        current = self.samples[index]
+        following = self.samples[(index + 1) % n]
+        np.subtract(following, current, out=out, dtype=np.float32) # In float, so integer PCM samples cannot wrap
+        out *= pos
+        out += current
+        # Playback is already normalized to full scale, so an amplitude factor above 1 is clamped
+        # rather than clipped by the device
+        out *= self.gain * min(self.amplitude, 1.0)
+
+        self.position = (self.position + step * frames) % n
+        return out
+
+    def _callback(self, outdata, frames, time_info, status):
+        self.render_block(outdata[:, 0])
+
+    def start(self):
+        """Opens the output stream and starts looping."""
+        if self._stream is None:
+            factory = self._stream_factory
+            if factory is None:
+                import sounddevice as sd
+                factory = sd.OutputStream
+            self._stream = factory(samplerate=self.samplerate, blocksize=self.blocksize, channels=1,
+                                   dtype='float32', callback=self._callback)
+        self._stream.start()
+        return self
+
+    def stop(self):
+        """Stops and closes the output stream."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    @property
+    def active(self):
+        return self._stream is not None
@@ -0,0 +1,163 @@
+import numpy as np
+from signal_generation import WAVEFORMS, sample_grid
+from signal_class import Signal
+from resampling import CHUNK_SIZE
+
+# This file contains SignalBank, which holds a sweep of signals as the rows of one 2-D array.
+# Every row has a uniform time axis, stored as a start time and step per row. Rows of
+# different lengths are padded with NaN, so generation, scaling and statistics run as
+# single broadcast NumPy operations instead of one Python call per signal.
+
+class SignalBank:
+    """
+    N signals stored as an (N, n) sample array. `lengths` holds the number of valid samples
+    in each row; `t0` and `dt` hold each row's start time and sample spacing.
+    """
+    def __init__(self, x, is_discrete, t0, dt, lengths=None, f=None, Fs=None, labels=None):
+        self.x = np.atleast_2d(x)
+        rows = len(self.x)
+        self.is_discrete = is_discrete
+        self.t0 = np.broadcast_to(np.asarray(t0, dtype=float), (rows,)).copy()
+        self.dt = np.broadcast_to(np.asarray(dt, dtype=float), (rows,)).copy()
+        self.lengths = np.full(rows, self.x.shape[1]) if lengths is None else np.asarray(lengths, dtype=np.int64)
+        self.f = None if f is None else np.broadcast_to(np.asarray(f, dtype=float), (rows,)).copy()
+        self.Fs = Fs
+        self.labels = list(labels) if labels is not None else [f"Signal {i + 1}" for i in range(rows)]
+
+    @classmethod
+    def generate(cls, sig_type, A, f, phi, Fs, duration=2.0, max_points=None):
+        """
+        Generates one row per combination of the A, f and phi values (scalars or sequences)
+        with a single broadcast kernel call. Continuous rows share the grid that resolves
+        the highest frequency in the sweep.
+        """
+        if sig_type not in WAVEFORMS:
+            raise ValueError(f"'{sig_type}' is not a generated waveform.")
+        A_grid, f_grid, phi_grid = (g.ravel() for g in np.meshgrid(np.atleast_1d(A), np.atleast_1d(f), np.atleast_1d(phi), indexing='ij'))
+        n, dt, is_discrete = sample_grid(sig_type, float(f_grid.max()), Fs, duration, max_points)
+        t = np.arange(n) * dt
+        x = WAVEFORMS[sig_type](t, A_grid[:, None], f_grid[:, None], phi_grid[:, None], out=np.empty((len(A_grid), n)))
+        labels = [f"A={a:g}, f={fr:g}, ϕ={p:g}" for a, fr, p in zip(A_grid, f_grid, phi_grid)]
+        return cls(x, is_discrete, 0.0, dt, f=f_grid, Fs=Fs, labels=labels)
+
+    @classmethod
+    def from_signal(cls, signal_obj):
+        """Wraps a Signal with a uniform time axis as a one-row bank, ready to be swept."""
+        t, x = signal_obj.t, signal_obj.x
+        if len(x) > 1:
+            dt = (t[-1] - t[0]) / (len(t) - 1)
+            if not signal_obj.is_compact and not np.allclose(np.diff(t), dt, rtol=1e-6):
+                raise ValueError("A signal bank needs a uniform time axis.")
+        else:
+            dt = 1.0 / signal_obj.Fs if signal_obj.Fs else 1.0
+        return cls(x[None, :], signal_obj.is_discrete, t[0] if len(t) else 0.0, dt, f=signal_obj.f, Fs=signal_obj.Fs, labels=["Signal"])
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the sample array."""
+        return self.x.nbytes
+
+    @property
+    def t(self):
+        """The time axes: one shared 1-D axis if every row has the same grid, else (N, n) padded with NaN."""
+        if np.all(self.lengths == self.x.shape[1]) and np.all(self.t0 == self.t0[0]) and np.all(self.dt == self.dt[0]):
+            return self.t0[0] + np.arange(self.x.shape[1]) * self.dt[0]
+        t = self.t0[:, None] + np.arange(self.x.shape[1]) * self.dt[:, None]
+        t[np.arange(self.x.shape[1]) >= self.lengths[:, None]] = np.nan
+        return t
+
+    def row(self, i):
+        """Returns row `i` as a compact Signal without its padding."""
+        n = self.lengths[i]
+        t = self.t0[i] + np.arange(n) * self.dt[i]
+        return Signal.from_samples(self.x[i, :n], self.Fs, is_discrete=self.is_discrete, t=t, f=None if self.f is None else float(self.f[i]))
+
+    def _expand(self, factors):
+        """Broadcasts a factor vector against the rows; a one-row bank fans out to one row per factor."""
+        factors = np.atleast_1d(np.asarray(factors, dtype=float))
+        rows = np.broadcast_shapes((len(self),), factors.shape)[0]
+        index = np.broadcast_to(np.arange(len(self)), (rows,))
+        labels = [self.labels[i] if len(factors) == 1 else None for i in index]
+        return np.broadcast_to(factors, (rows,)), index, labels
+
+    def _take(self, index, x, labels, lengths=None, t0=None, dt=None, f=None):
+        """Builds a bank from the rows `index` of this one with the given replacements."""
+        return SignalBank(x, self.is_discrete, self.t0[index] if t0 is None else t0, self.dt[index] if dt is None else dt,
+                          lengths=self.lengths[index] if lengths is None else lengths,
+                          f=(None if self.f is None else self.f[index]) if f is None else f, Fs=self.Fs, labels=labels)
+
+    def scale_amplitude(self, factors):
+        """
+        Performs amplitude scaling with one factor per row.
+        Returns a new SignalBank; a one-row bank returns one row per factor.
+        """
+        factors, index, labels = self._expand(factors)
+        labels = [label or f"{self.labels[i]} × {a:g}" for label, i, a in zip(labels, index, factors)]
+        # Integer samples (e.g. imported PCM) are promoted, so factors neither truncate nor overflow
+        dtype = np.result_type(self.x.dtype, np.float32)
+        return self._take(index, self.x[index] * factors[:, None].astype(dtype), labels)
+
+    def scale_time(self, factors):
+        """
+        Performs time scaling with one factor per row, using the same sample layout as
+        Signal.scale_time in 'linear' mode. Discrete rows are resampled to int(n / factor)
+        samples by one interpolation over the whole bank; continuous rows keep their
+        samples and compress their time axis. Returns a new SignalBank.
+        """
+        factors, index, labels = self._expand(factors)
+        labels = [label or f"{self.labels[i]} @ a={a:g}" for label, i, a in zip(labels, index, factors)]
+        lengths = self.lengths[index]
+        durations = (lengths - 1) * self.dt[index]
+        f = None if self.f is None else self.f[index] * factors
+        if not self.is_discrete:
+            return self._take(index, self.x[index], labels, dt=self.dt[index] / factors, f=f)
+
+        num_out = np.maximum(1, (lengths / factors).astype(np.int64))
+        keep = (lengths < 2) | (factors == 1.0)
+        num_out[keep] = lengths[keep]
+        step = np.where(num_out > 1, (lengths - 1) / np.maximum(num_out - 1, 1), 0.0)[:, None]
+        last_in = (lengths - 1)[:, None]
+        x = np.ascontiguousarray(self.x[index])
+        # Rows are laid end to end, so one interpolation over the flattened array serves every row;
+        # positions are clipped to their own row, so no output blends across a row boundary
+        flat, offsets = x.ravel(), (np.arange(len(x)) * x.shape[1])[:, None]
+        grid = np.arange(len(flat), dtype=float)
+
+        # Evaluate in column chunks so the position temporaries stay cache-sized; rows that have
+        # already ended are skipped, and every row's tail is padded afterwards
+        y = np.empty((len(x), num_out.max()), dtype=np.result_type(x.dtype, np.float32)) # Floating, to hold the NaN padding
+        chunk = max(1, CHUNK_SIZE // len(x))
+        for j0 in range(0, y.shape[1], chunk):
+            rows = np.flatnonzero(num_out > j0)
+            j = np.arange(j0, min(j0 + chunk, y.shape[1]))
+            pos = j * step[rows]
+            np.minimum(pos, last_in[rows], out=pos) # Rounding must not carry the end point into the next row
+            pos += offsets[rows]
+            y[rows, j0:j0 + len(j)] = np.interp(pos, grid, flat)
+        for i, n in enumerate(num_out):
+            y[i, n:] = np.nan
+
+        dt = np.where(num_out > 1, (durations / factors) / np.maximum(num_out - 1, 1), self.dt[index])
+        return self._take(index, y, labels, lengths=num_out, dt=dt, f=f)
+
+    def calculate_stats(self):
+        """
+        Calculates the statistics of Signal.calculate_stats for every row at once, reducing
+        along the sample axis. Returns a dictionary of arrays with one value per row.
+        """
+        x = self.x
+        squares = np.nansum(x.astype(float) ** 2, axis=1)
+        durations = np.where(self.lengths > 1, (self.lengths - 1) * self.dt, 1.0)
+        energy = squares if self.is_discrete else squares * np.where(self.lengths > 1, self.dt, 1.0)
+        return {
+            'Max': np.nanmax(x, axis=1).astype(float),
+            'Min': np.nanmin(x, axis=1).astype(float),
+            'Mean': np.nanmean(x, axis=1).astype(float),
+            'RMS': np.sqrt(squares / self.lengths),
+            'Energy': energy,
+            'Power': np.where(durations > 0, energy / durations, np.nan),
+            'Period': np.full(len(self), np.nan) if self.f is None else np.where(self.f > 0, 1 / np.where(self.f > 0, self.f, 1), np.nan),
+        }
@@ -0,0 +1,183 @@
+"""
+Headless batch runner: generate -> scale -> stats -> export for many parameter sets.
+
+    python batch.py jobs.json --output results.jsonl --out-dir exports --export NPY --workers 8
+
+The job spec is a JSON list of jobs, a JSON-lines file with one job per line, or an object
+{"defaults": {...}, "grid": {"f": [1, 2], "time_factor": [0.5, 2.0], ...}} that expands to
+every combination of the grid values. Job keys: sig_type, A, f, phi, Fs, duration,
+custom_data, amp_factor, time_factor, mode.
+
+With --stream, generated waveforms are scaled, measured and exported block by block inside
+the worker (see streaming.py), so hours-long signals run in bounded memory.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+from signal_generation import generate_signal, Generator, WAVEFORMS
+from signal_class import Signal
+from streaming import SignalStream
+from resampling import DEFAULT_MODE
+import export
+
+JOB_DEFAULTS = {
+    'sig_type': 'Sine', 'A': 1.0, 'f': 2.0, 'phi': 0.0, 'Fs': 16000, 'duration': 2.0, 'custom_data': None,
+    'amp_factor': 1.0, 'time_factor': 1.0, 'mode': DEFAULT_MODE,
+}
+
+def load_jobs(path):
+    """Reads a job spec file and returns the expanded list of jobs, with defaults filled in."""
+    with open(path) as fh:
+        text = fh.read()
+    try:
+        spec = json.loads(text)
+    except json.JSONDecodeError:
+        spec = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return expand_jobs(spec)
+
+def expand_jobs(spec):
+    """Expands a list of jobs or a {"defaults", "grid", "jobs"} object into a flat list of jobs."""
+    if isinstance(spec, list):
+        return [{**JOB_DEFAULTS, **job} for job in spec]
+    defaults = {**JOB_DEFAULTS, **spec.get('defaults', {})}
+    jobs = [{**defaults, **job} for job in spec.get('jobs', [])]
+    grid = spec.get('grid', {})
+    if grid:
+        keys = list(grid)
+        jobs += [{**defaults, **dict(zip(keys, values))} for values in itertools.product(*(grid[k] for k in keys))]
+    return jobs
+
+def _create_untracked(size):
+    """Creates a shared memory block whose lifetime is owned by the parent, which unlinks it after export."""
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        resource_tracker.unregister(shm._name, 'shared_memory') # Keep the worker's tracker from reclaiming it
+        return shm
+
+def run_job(index, job, share_samples):
+    """
+    Runs one job in a worker process. With `share_samples`, the scaled samples are copied
+    into a shared memory block once and described in the result, so the parent can export
+    them without pickling the array.
+    """
+    t, x, is_discrete = generate_signal(job['sig_type'], job['A'], job['f'], job['phi'], job['Fs'], job['duration'], job['custom_data'])
+    if t is None:
+        return {'index': index, 'job': job, 'error': 'Signal could not be generated'}
+
+    generator = Generator(job['sig_type'], job['A'], job['f'], job['phi']) if job['sig_type'] in WAVEFORMS else None
+    signal_obj = Signal(t, x, is_discrete, f=job['f'], Fs=job['Fs'], compact=True, generator=generator)
+    scaled = signal_obj.scale_amplitude(job['amp_factor']).scale_time(job['time_factor'], job['mode'])
+    result = {'index': index, 'job': job, 'stats': scaled.calculate_stats(), 'num_samples': len(scaled.x)}
+
+    if share_samples:
+        samples = scaled.x
+        shm = _create_untracked(max(1, samples.nbytes))
+        np.ndarray(samples.shape, dtype=samples.dtype, buffer=shm.buf)[:] = samples
+        t_axis = scaled.t
+        result['shared'] = {
+            'name': shm.name, 'shape': samples.shape, 'dtype': samples.dtype.str,
+            't0': float(t_axis[0]) if len(t_axis) else 0.0, 'is_discrete': scaled.is_discrete, 'f': scaled.f,
+            'Fs': (len(t_axis) - 1) / float(t_axis[-1] - t_axis[0]) if len(t_axis) > 1 else job['Fs'],
+        }
+        shm.close()
+    return result
+
+def run_stream_job(index, job, export_format, out_dir):
+    """
+    Runs one job as a SignalStream in a worker process: one pass for the stats and one
+    for the export, each holding a single block at a time. Only linear resampling streams.
+    """
+    if job['mode'] != 'linear':
+        return {'index': index, 'job': job, 'error': "Streaming jobs support only the 'linear' resampling mode"}
+    try:
+        stream = SignalStream.generate(job['sig_type'], job['A'], job['f'], job['phi'], job['Fs'], job['duration'])
+    except ValueError as e:
+        return {'index': index, 'job': job, 'error': str(e)}
+
+    scaled = stream.scale_amplitude(job['amp_factor']).scale_time(job['time_factor'])
+    result = {'index': index, 'job': job, 'stats': scaled.calculate_stats(), 'num_samples': scaled.num_samples}
+    if export_format is not None:
+        path = os.path.join(out_dir, f"job_{index:06d}.{export.FORMATS[export_format][0]}")
+        with open(path, 'wb') as fh:
+            scaled.export(export_format, fh)
+        result['export'] = path
+    return result
+
+def _export_shared(result, fmt, out_dir):
+    """Wraps a worker's shared memory block in a Signal, exports it and releases the block."""
+    shared = result.pop('shared')
+    shm = shared_memory.SharedMemory(name=shared['name'])
+    try:
+        samples = np.ndarray(shared['shape'], dtype=shared['dtype'], buffer=shm.buf)
+        signal_obj = Signal.from_samples(samples, shared['Fs'], is_discrete=shared['is_discrete'], t0=shared['t0'], f=shared['f'])
+        extension = export.FORMATS[fmt][0]
+        path = os.path.join(out_dir, f"job_{result['index']:06d}.{extension}")
+        with open(path, 'wb') as fh:
+            export.write(signal_obj, fmt, fh, samplerate=shared['Fs'])
+        result['export'] = path
+        del samples, signal_obj
+    finally:
+        shm.close()
+        shm.unlink()
+
+def run_batch(jobs, output, workers=None, export_format=None, out_dir='.', stream=False):
+    """
+    Fans the jobs out over a process pool and appends one JSON line per finished job to
+    `output` as soon as it completes. At most two jobs per worker are in flight, which
+    bounds the shared memory held at once. With `stream`, workers run run_stream_job and
+    export directly. Returns the number of failed jobs.
+    """
+    workers = workers or os.cpu_count() or 1
+    share_samples = export_format is not None and not stream
+    if export_format is not None:
+        os.makedirs(out_dir, exist_ok=True)
+
+    failures = 0
+    pending, job_iter = set(), iter(enumerate(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(output, 'w') as out:
+        while True:
+            for index, job in itertools.islice(job_iter, 2 * workers - len(pending)):
+                if stream:
+                    pending.add(pool.submit(run_stream_job, index, job, export_format, out_dir))
+                else:
+                    pending.add(pool.submit(run_job, index, job, share_samples))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                    if 'shared' in result:
+                        _export_shared(result, export_format, out_dir)
+                except Exception as e:
+                    result = {'error': f"{type(e).__name__}: {e}"}
+                failures += 'error' in result
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run WaveScaler generate/scale/stats/export jobs without the UI.")
+    parser.add_argument('spec', help="Job spec file (JSON list, JSON lines or grid object)")
+    parser.add_argument('--output', default='results.jsonl', help="JSON-lines file that receives one result per job")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument('--export', choices=list(export.FORMATS), default=None, help="Also write each scaled signal in this format")
+    parser.add_argument('--out-dir', default='exports', help="Directory for exported signals")
+    parser.add_argument('--stream', action='store_true', help="Process generated waveforms block by block in bounded memory")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.spec)
+    failures = run_batch(jobs, args.output, args.workers, args.export, args.out_dir, args.stream)
+    print(f"{len(jobs) - failures}/{len(jobs)} jobs succeeded; results in {args.output}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
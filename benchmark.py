@@ -0,0 +1,217 @@
+"""
+Benchmark suite for WaveScaler's hot paths across signal sizes.
+
+    python benchmark.py                                  # run and print the results
+    python benchmark.py --save-baseline baseline.json    # record a baseline
+    python benchmark.py --baseline baseline.json         # fail (exit 1) on regressions
+    python benchmark.py --check                          # ... against the committed benchmark_baseline.json
+    python benchmark.py --sizes 1000 10000000 --only scale_time
+    python benchmark.py --only startup --import-budget 1.0
+    python benchmark.py --only scale_time/mode           # resampling modes: time and error
+
+Each case reports its best wall time over --repeats runs and its peak traced memory
+(measured in a separate run, so tracing does not skew the timings). The scale_time/mode
+cases also report each resampling mode's round-trip error (see resampling.compare_modes),
+so a baseline catches a mode that gets less accurate as well as one that gets slower. The startup case times
+a cold import of the app's modules in a fresh interpreter and fails the run if it exceeds
+--import-budget or loads a module that should be deferred to first use.
+
+benchmark_baseline.json holds reference results for the default sizes. Timings depend on the
+machine, so record a fresh one (python benchmark.py --save-baseline benchmark_baseline.json)
+before checking on different hardware, and re-record it with any change that is meant to
+move the numbers.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from signal_generation import generate_signal, waveform_names, DISCRETE_TYPES
+from signal_class import Signal
+from bank import SignalBank
+from resampling import MODES, compare_modes
+from plotting import plot_signal
+import export
+import audio
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+TIME_FACTORS = [0.2, 0.5, 2.0, 5.0]
+MODE_FACTORS = [0.5, 2.0] # Stretch and compress, for the per-mode cases
+FS = 16000
+STARTUP_MODULES = ['signal_generation', 'plotting', 'signal_class', 'bank', 'importer', 'export', 'audio', 'tracing', 'jobs', 'cache', 'store']
+DEFERRED_MODULES = ['sounddevice', 'scipy.signal', 'scipy.io', 'scipy.fft', 'plotly.subplots'] # Imported on first use only
+IMPORT_BUDGET_SECONDS = 1.5
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json') # Reference results for --check
+TIME_SLACK_SECONDS = 0.01 # Absolute slack on top of --time-tolerance, so timer noise on sub-millisecond cases is not a regression
+MEMORY_SLACK_BYTES = 1 << 20 # Likewise for peak memory, where interpreter caches vary by a few hundred KB
+
+def _test_signal(n, is_discrete):
+    """A 5 Hz sine of n samples, built the way the app stores it."""
+    t = np.arange(n) / FS
+    return Signal(t, np.sin(2 * np.pi * 5 * t), is_discrete, f=5, Fs=FS, compact=True)
+
+def _fresh(signal_obj):
+    """A cache-free view of the same samples, so cached results are not what gets timed."""
+    audio.clear_render_cache()
+    t_start = signal_obj.t[0] if len(signal_obj.x) else 0.0
+    return Signal.from_samples(signal_obj.x, signal_obj.Fs, is_discrete=signal_obj.is_discrete, t0=t_start, f=signal_obj.f)
+
+def cold_import():
+    """Imports STARTUP_MODULES (the app's imports besides Streamlit) in a fresh interpreter; returns the DEFERRED_MODULES it loaded."""
+    code = f"import sys; import {', '.join(STARTUP_MODULES)}; print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return result.stdout.split()
+
+def build_cases(sizes, only=None):
+    """
+    Returns (name, size, setup, run, error) tuples; run(state) is timed, setup() builds its input
+    and error(state), if not None, measures the accuracy of the case's result.
+    """
+    cases = [("startup/import", 0, lambda: None, lambda _: cold_import(), None)]
+    for n in sizes:
+        for sig_type in waveform_names():
+            if sig_type.startswith('Custom'):
+                continue
+            if sig_type in DISCRETE_TYPES:
+                args = (sig_type, 1.0, 5.0, 30.0, FS, n / FS)
+            else:
+                args = (sig_type, 1.0, 5.0, 30.0, FS, n / (5.0 * 50)) # 50 points per cycle
+            cases.append((f"generate/{sig_type}", n, lambda: None, lambda _, args=args: generate_signal(*args), None))
+
+        for is_discrete in (True, False):
+            kind = 'discrete' if is_discrete else 'continuous'
+            for factor in TIME_FACTORS:
+                cases.append((f"scale_time/{kind}/x{factor}", n, lambda n=n, d=is_discrete: _test_signal(n, d),
+                              lambda s, factor=factor: s.scale_time(factor).x, None))
+            cases.append((f"stats/{kind}", n, lambda n=n, d=is_discrete: _fresh(_test_signal(n, d)),
+                          lambda s: s.calculate_stats(), None))
+            cases.append((f"spectrum/{kind}", n, lambda n=n, d=is_discrete: _fresh(_test_signal(n, d)),
+                          lambda s: s.spectrum(), None))
+            cases.append((f"plot/{kind}", n, lambda n=n, d=is_discrete: _fresh(_test_signal(n, d)),
+                          lambda s: plot_signal(s, "").to_json(), None))
+
+        # Every resampling mode on the same discrete signal: its speed, and its round-trip error
+        for mode in MODES:
+            for factor in MODE_FACTORS:
+                cases.append((f"scale_time/mode/{mode}/x{factor}", n, lambda n=n: _test_signal(n, True),
+                              lambda s, factor=factor, mode=mode: s.scale_time(factor, mode).x,
+                              lambda s, factor=factor, mode=mode: compare_modes(s.x, factor, [mode], repeats=1)[0]['relative_rms_error']))
+
+        # The same sweep over TIME_FACTORS, one Signal at a time and as one SignalBank
+        cases.append(("sweep/loop", n, lambda n=n: _test_signal(n, True),
+                      lambda s: [s.scale_time(factor).x for factor in TIME_FACTORS], None))
+        cases.append(("sweep/bank", n, lambda n=n: SignalBank.from_signal(_test_signal(n, True)),
+                      lambda b: b.scale_time(TIME_FACTORS).x, None))
+
+        for fmt in export.FORMATS:
+            cases.append((f"export/{fmt}", n, lambda n=n: _fresh(_test_signal(n, True)),
+                          lambda s, fmt=fmt: export.export_bytes(s, fmt, 44100), None))
+
+    if only:
+        cases = [case for case in cases if any(case[0].startswith(prefix) for prefix in only)]
+    return cases
+
+def run_case(setup, run, repeats):
+    """Returns (best seconds, peak traced bytes, output size in bytes if the run returns str/bytes)."""
+    best = np.inf
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        output = run(state)
+        best = min(best, time.perf_counter() - start)
+
+    state = setup()
+    tracemalloc.start()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = len(output) if isinstance(output, (str, bytes)) else None
+    return best, peak, size
+
+def compare(results, baseline, time_tolerance, memory_tolerance, error_tolerance):
+    """Returns a (case key, message) pair for every case slower, hungrier or less accurate than its baseline allows."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + time_tolerance) + TIME_SLACK_SECONDS:
+            regressions.append((key, f"{key}: {result['seconds'] * 1e3:.2f} ms vs baseline {base['seconds'] * 1e3:.2f} ms"))
+        if result['peak_bytes'] > base['peak_bytes'] * (1 + memory_tolerance) + MEMORY_SLACK_BYTES:
+            regressions.append((key, f"{key}: peak {result['peak_bytes'] / 1e6:.2f} MB vs baseline {base['peak_bytes'] / 1e6:.2f} MB"))
+        error, base_error = result.get('relative_rms_error'), base.get('relative_rms_error')
+        if error is not None and base_error is not None and error > base_error * (1 + error_tolerance) + 1e-12:
+            regressions.append((key, f"{key}: relative RMS error {error:.3g} vs baseline {base_error:.3g}"))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, scaling, stats, plotting and export.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Signal sizes in samples (up to 10M)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help="Only run cases whose name starts with one of these prefixes")
+    parser.add_argument('--baseline', help="Compare against this baseline file and exit 1 on regressions")
+    parser.add_argument('--check', action='store_true', help="Compare against the committed benchmark_baseline.json")
+    parser.add_argument('--save-baseline', help="Write the results to this baseline file")
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help="Allowed slowdown before failing (0.5 = 50%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="Allowed peak-memory growth before failing")
+    parser.add_argument('--error-tolerance', type=float, default=0.1, help="Allowed growth of a resampling mode's error before failing")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_SECONDS, help="Cold-start import budget in seconds")
+    args = parser.parse_args(argv)
+    if args.check and not args.baseline:
+        args.baseline = BASELINE_FILE
+
+    results = {}
+    cases = build_cases(args.sizes, args.only)
+    print(f"{'case':<42}{'size':>10}{'time (ms)':>12}{'peak (MB)':>12}{'output (KB)':>13}{'rel. error':>12}")
+    for name, n, setup, run, measure_error in cases:
+        seconds, peak, size = run_case(setup, run, args.repeats)
+        error = measure_error(setup()) if measure_error is not None else None
+        key = f"{name}/n={n}"
+        results[key] = {'seconds': seconds, 'peak_bytes': peak, 'output_bytes': size, 'relative_rms_error': error}
+        size_text = f"{size / 1e3:.1f}" if size is not None else "-"
+        error_text = f"{error:.2e}" if error is not None else "-"
+        print(f"{name:<42}{n:>10}{seconds * 1e3:>12.2f}{peak / 1e6:>12.2f}{size_text:>13}{error_text:>12}", flush=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as fh:
+            json.dump(results, fh, indent=1, sort_keys=True)
+        print(f"Baseline written to {args.save_baseline}")
+
+    startup = results.get("startup/import/n=0")
+    if startup is not None:
+        problems = [f"{module} is imported at startup" for module in cold_import()]
+        if startup['seconds'] > args.import_budget:
+            problems.append(f"cold import took {startup['seconds'] * 1e3:.0f} ms, over the {args.import_budget * 1e3:.0f} ms budget")
+        if problems:
+            print("\nStartup budget exceeded:")
+            for message in problems:
+                print(f"  {message}")
+            return 1
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance, args.error_tolerance)
+        if regressions:
+            # Time the flagged cases once more and keep their better run, so one noisy run is not a regression
+            flagged = {key for key, _ in regressions}
+            for name, n, setup, run, _ in cases:
+                result = results.get(f"{name}/n={n}")
+                if f"{name}/n={n}" in flagged:
+                    seconds, peak, _ = run_case(setup, run, args.repeats)
+                    result['seconds'], result['peak_bytes'] = min(result['seconds'], seconds), min(result['peak_bytes'], peak)
+            regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance, args.error_tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):")
+            for _, message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
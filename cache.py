@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# This file contains the cross-rerun result cache. Entries are keyed by content (the
+# generation parameters and scaling history that produced them), so every session in
+# the server process shares them, and least recently used entries are evicted first
+# once the byte budget is exceeded.
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get('WAVESCALER_CACHE_BYTES', 256 * 1024 * 1024))
+
+def make_key(*parts):
+    """Returns a stable content key for JSON-serializable parts such as parameters and histories."""
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+def estimate_size(value):
+    """Approximate bytes held by a cached value: signal arrays, figure trace data or a small object."""
+    if value is None:
+        return 0
+    if hasattr(value, 'nbytes') and not isinstance(value, np.ndarray):
+        return value.nbytes # Signal or SignalBank
+    if hasattr(value, 'data') and hasattr(value, 'layout'): # Plotly figure
+        total = 0
+        for trace in value.data:
+            for attr in ('x', 'y'):
+                data = trace[attr] if attr in trace else None
+                if isinstance(data, dict) and 'bdata' in data: # Typed-array spec (see plotting.typed_array)
+                    total += len(data['bdata'])
+                elif data is not None:
+                    total += data.nbytes if isinstance(data, np.ndarray) else 8 * len(data)
+        return total
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return 1024
+
+class ResultCache:
+    """A thread-safe LRU cache bounded by the estimated size of its entries."""
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict() # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, size=None):
+        """Stores a value and evicts the least recently used entries until the budget is met."""
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return # Would evict everything else and still not fit
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, computing and storing it on a miss. None results are not cached."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def usage(self):
+        """Returns counters for the debug panel: entries, bytes, hits and misses."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.nbytes, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+# Shared by every session in this server process
+RESULT_CACHE = ResultCache()
@@ -0,0 +1,93 @@
+import numpy as np
+
+# This file contains the level-of-detail engine used to keep large signals interactive.
+
+class MinMaxPyramid:
+    """
+    A multi-resolution min/max pyramid over a signal's samples.
+    Level 0 holds every sample; each level above merges `factor` buckets of the
+    level below and keeps the index of the smallest and largest sample in each bucket.
+    Queries therefore always return real samples, so peaks are never lost.
+    """
+    def __init__(self, x, factor=4, min_buckets=256):
+        self.n = len(x)
+        self.factor = factor
+        self.levels = [] # One (idx_min, idx_max) pair per level above level 0
+
+        x = self._x = np.asarray(x) # Kept to merge further than the top level for small max_points
+        # Sample indices take half the memory as int32, which covers any signal below 2**31 samples
+        idx_min = idx_max = np.arange(self.n, dtype=np.int32 if self.n < 2**31 else np.int64)
+        while len(idx_min) > min_buckets:
+            idx_min, idx_max = self._merge(x, idx_min, idx_max, factor)
+            self.levels.append((idx_min, idx_max))
+
+    @staticmethod
+    def _merge(x, idx_min, idx_max, factor):
+        """Combines groups of `factor` buckets into one, keeping the extreme sample indices."""
+        n_buckets = len(idx_min)
+        n_full = (n_buckets // factor) * factor
+        new_min, new_max = [], []
+
+        if n_full:
+            grp_min = idx_min[:n_full].reshape(-1, factor)
+            grp_max = idx_max[:n_full].reshape(-1, factor)
+            rows = np.arange(len(grp_min))
+            new_min.append(grp_min[rows, np.argmin(x[grp_min], axis=1)])
+            new_max.append(grp_max[rows, np.argmax(x[grp_max], axis=1)])
+
+        # Leftover buckets that do not fill a whole group become one final bucket
+        if n_full < n_buckets:
+            tail_min, tail_max = idx_min[n_full:], idx_max[n_full:]
+            new_min.append(tail_min[[np.argmin(x[tail_min])]])
+            new_max.append(tail_max[[np.argmax(x[tail_max])]])
+
+        return np.concatenate(new_min), np.concatenate(new_max)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the level indices (the samples themselves belong to the signal)."""
+        return sum(idx_min.nbytes + idx_max.nbytes for idx_min, idx_max in self.levels)
+
+    def bucket_size(self, level):
+        """Number of original samples covered by one bucket at the given level."""
+        return self.factor ** level
+
+    def query(self, start, stop, max_points):
+        """
+        Returns sorted sample indices in [start, stop) that describe the signal with
+        at most roughly `max_points` points, picking the finest level that fits.
+        """
+        start, stop = max(0, int(start)), min(self.n, int(stop))
+        if stop <= start:
+            return np.arange(0)
+        if stop - start <= max_points:
+            return np.arange(start, stop)
+
+        # Each bucket contributes two points (its min and its max); a signal too short for any
+        # level starts from level 0, where every sample is its own bucket
+        if not self.levels:
+            idx_min = idx_max = np.arange(start, stop)
+            b0, b1 = 0, stop - start
+        for level, (idx_min, idx_max) in enumerate(self.levels, start=1):
+            size = self.bucket_size(level)
+            b0, b1 = start // size, -(-stop // size)
+            if (b1 - b0) * 2 <= max_points:
+                break
+        idx_min, idx_max = idx_min[b0:b1], idx_max[b0:b1]
+        # Still too many buckets (max_points is below the top level's size): merge the visible ones further
+        while len(idx_min) * 2 > max_points and len(idx_min) > 1:
+            idx_min, idx_max = self._merge(self._x, idx_min, idx_max, self.factor)
+
+        lo, hi = np.minimum(idx_min, idx_max), np.maximum(idx_min, idx_max)
+        idx = np.empty(2 * len(lo), dtype=lo.dtype)
+        idx[0::2], idx[1::2] = lo, hi
+        return idx[(idx >= start) & (idx < stop)]
+
+def visible_range(t, x_range=None):
+    """Converts an optional (t_start, t_end) window into a [start, stop) sample index range."""
+    if x_range is None:
+        return 0, len(t)
+    start = int(np.searchsorted(t, x_range[0], side='left'))
+    stop = int(np.searchsorted(t, x_range[1], side='right'))
+    # Keep one sample either side so lines run off the edges of the view
+    return max(0, start - 1), min(len(t), stop + 1)
@@ -0,0 +1,118 @@
+import io
+import struct
+import numpy as np
+import audio
+
+# This file contains the export layer. Nothing is serialized until a download is requested,
+# and every writer streams the signal block by block into a file-like object.
+
+CHUNK_SIZE = 65536 # Samples formatted or written per block
+
+# --- Block Writers ---
+# These take any iterable of (t, x) blocks, such as Signal.iter_blocks or a SignalStream,
+# plus whatever the header needs up front.
+def write_csv_blocks(blocks, fh):
+    """Writes 'time_s,amplitude' rows, formatting each block with a single string operation."""
+    fh.write(b"time_s,amplitude\n")
+    for t, x in blocks:
+        # float32 amplitudes get the 9 significant digits that round-trip them, not the noise
+        # digits of their float64 repr; float64 and integer samples keep their exact repr
+        row_format = "%r,%.9g\n" if x.dtype == np.float32 else "%r,%r\n"
+        rows = [None] * (2 * len(x))
+        rows[0::2], rows[1::2] = t.tolist(), x.tolist()
+        fh.write((row_format * len(x) % tuple(rows)).encode())
+
+def write_npy_blocks(blocks, fh, num_samples, sample_dtype):
+    """Writes a .npy file holding a structured (time_s, amplitude) array of `num_samples` rows."""
+    dtype = np.dtype([('time_s', '<f8'), ('amplitude', np.dtype(sample_dtype).newbyteorder('<'))])
+    np.lib.format.write_array_header_1_0(fh, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (num_samples,)})
+    for t, x_block in blocks:
+        rows = np.empty(len(x_block), dtype=dtype)
+        rows['time_s'], rows['amplitude'] = t, x_block
+        fh.write(rows.tobytes())
+
+def _write_wav_header(fh, samplerate, num_frames, sample_width, is_float):
+    """Writes a mono RIFF/WAVE header for `num_frames` frames, so samples can be streamed after it."""
+    data_size = num_frames * sample_width
+    if is_float:
+        fmt = struct.pack('<HHIIHHH', 3, 1, samplerate, samplerate * sample_width, sample_width, 8 * sample_width, 0)
+        extra = b'fact' + struct.pack('<II', 4, num_frames)
+    else:
+        fmt = struct.pack('<HHIIHH', 1, 1, samplerate, samplerate * sample_width, sample_width, 8 * sample_width)
+        extra = b''
+    riff_size = 4 + (8 + len(fmt)) + len(extra) + (8 + data_size)
+    fh.write(b'RIFF' + struct.pack('<I', riff_size) + b'WAVE')
+    fh.write(b'fmt ' + struct.pack('<I', len(fmt)) + fmt + extra)
+    fh.write(b'data' + struct.pack('<I', data_size))
+
+def write_wav_float32_blocks(blocks, fh, samplerate, num_samples):
+    """
+    Writes the samples as a 32-bit float WAV. Float samples are written unchanged; integer PCM
+    (e.g. an imported 16-bit WAV) is scaled by its dtype's full scale to the float range of +/-1.
+    """
+    _write_wav_header(fh, int(samplerate), num_samples, 4, is_float=True)
+    for _, x in blocks:
+        if x.dtype.kind in 'iu':
+            info = np.iinfo(x.dtype)
+            offset = 0 if x.dtype.kind == 'i' else (int(info.max) + 1) // 2 # Unsigned PCM (8-bit WAV) is centred on its midpoint
+            x = np.clip((x.astype('<f4') - offset) / (info.max - offset), -1.0, 1.0) # The most negative value reaches just past -1
+        fh.write(x.astype('<f4', copy=False).tobytes())
+
+def write_wav_int16_blocks(blocks, fh, samplerate, num_samples, peak):
+    """Writes a 16-bit WAV normalized so that `peak` (the largest absolute sample) is full scale."""
+    _write_wav_header(fh, int(samplerate), num_samples, 2, is_float=False)
+    gain = 32767 / peak if peak > 0 else 1.0
+    for _, x in blocks:
+        fh.write(np.clip(x * gain, -32768, 32767).astype('<i2').tobytes())
+
+# --- Signal Writers ---
+def write_csv(signal_obj, fh, chunk_size=CHUNK_SIZE):
+    """Writes 'time_s,amplitude' rows for the signal."""
+    write_csv_blocks(signal_obj.iter_blocks(chunk_size), fh)
+
+def write_npy(signal_obj, fh, chunk_size=CHUNK_SIZE):
+    """Writes a .npy file holding a structured (time_s, amplitude) array in the signal's storage dtype."""
+    x = signal_obj.x
+    write_npy_blocks(signal_obj.iter_blocks(chunk_size), fh, len(x), x.dtype)
+
+def write_wav_float32(signal_obj, fh, chunk_size=CHUNK_SIZE):
+    """Writes the samples as a 32-bit float WAV at the signal's own sampling rate (see write_wav_float32_blocks)."""
+    write_wav_float32_blocks(signal_obj.iter_blocks(chunk_size), fh, signal_obj.Fs, len(signal_obj.x))
+
+def write_wav_int16(signal_obj, fh, samplerate, chunk_size=CHUNK_SIZE):
+    """Writes the shared normalized int16 render (see audio.render_int16) at `samplerate`."""
+    audio_int16 = audio.render_int16(signal_obj, samplerate)
+    _write_wav_header(fh, int(samplerate), len(audio_int16), 2, is_float=False)
+    for i in range(0, len(audio_int16), chunk_size):
+        fh.write(audio_int16[i:i + chunk_size].astype('<i2', copy=False).tobytes())
+
+# Export format name -> (file extension, MIME type, discrete signals only)
+FORMATS = {
+    'CSV': ('csv', 'text/csv', False),
+    'NPY': ('npy', 'application/octet-stream', False),
+    'WAV (16-bit)': ('wav', 'audio/wav', True),
+    'WAV (float32)': ('wav', 'audio/wav', True),
+}
+
+def available_formats(signal_obj):
+    """Returns the export formats that apply to the signal."""
+    return [name for name, (_, _, discrete_only) in FORMATS.items() if signal_obj.is_discrete or not discrete_only]
+
+def write(signal_obj, fmt, fh, samplerate=None):
+    """Streams the signal to the file-like object `fh` in the given export format."""
+    if fmt == 'CSV':
+        write_csv(signal_obj, fh)
+    elif fmt == 'NPY':
+        write_npy(signal_obj, fh)
+    elif fmt == 'WAV (16-bit)':
+        write_wav_int16(signal_obj, fh, samplerate)
+    elif fmt == 'WAV (float32)':
+        write_wav_float32(signal_obj, fh)
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from {list(FORMATS)}.")
+
+def export_bytes(signal_obj, fmt, samplerate=None):
+    """Serializes the signal in the given format and returns the file contents."""
+    buffer = io.BytesIO()
+    write(signal_obj, fmt, buffer, samplerate)
+    return buffer.getvalue()
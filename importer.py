@@ -0,0 +1,111 @@
+import io
+import os
+import numpy as np
+from signal_class import Signal
+
+# This file contains the bulk import subsystem. Binary formats are memory-mapped (or read
+# straight from an in-memory buffer) and wrapped in a Signal without copying the samples.
+
+FORMATS = ('wav', 'npy', 'csv', 'raw')
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _buffer(source):
+    """Returns the bytes behind an in-memory upload (e.g. Streamlit's UploadedFile) without copying."""
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer()
+    return source.read()
+
+def load_wav(source):
+    """Loads a WAV file's first channel as (x, Fs). Files on disk are memory-mapped."""
+    from scipy.io import wavfile # Only WAV imports need scipy.io
+    if _is_path(source):
+        Fs, data = wavfile.read(source, mmap=True)
+    else:
+        Fs, data = wavfile.read(io.BytesIO(_buffer(source)))
+    return (data[:, 0] if data.ndim > 1 else data), Fs
+
+def load_npy(source):
+    """
+    Loads a .npy file as (t, x). Files on disk are memory-mapped. Accepts a 1-D sample array,
+    an (n, 2) array of time and amplitude columns, or the structured array written by export.py.
+    """
+    if _is_path(source):
+        data = np.load(source, mmap_mode='r')
+    else:
+        # Parse the header, then view the payload in place
+        buffer = _buffer(source)
+        header = io.BytesIO(bytes(buffer[:65546]))
+        version = np.lib.format.read_magic(header)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(header)
+        data = np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape)), offset=header.tell()).reshape(shape, order='F' if fortran_order else 'C')
+    if data.dtype.names and {'time_s', 'amplitude'} <= set(data.dtype.names):
+        return data['time_s'], data['amplitude']
+    if data.ndim == 2 and data.shape[1] == 2:
+        return data[:, 0], data[:, 1]
+    if data.ndim == 1:
+        return None, data
+    raise ValueError(f"Unsupported .npy array shape {data.shape}")
+
+def load_raw(source, dtype=np.float32, offset=0):
+    """Loads headerless binary samples of the given dtype. Files on disk are memory-mapped."""
+    if _is_path(source):
+        return np.memmap(source, dtype=dtype, mode='r', offset=offset)
+    return np.frombuffer(_buffer(source), dtype=dtype, offset=offset)
+
+def load_csv(source):
+    """
+    Loads a CSV file of samples, or of 'time_s,amplitude' rows as written by export.py,
+    as (t, x). A non-numeric header line is skipped.
+    """
+    if _is_path(source):
+        with open(source) as fh:
+            text = fh.read()
+    else:
+        text = bytes(_buffer(source)).decode()
+    try:
+        [float(v) for v in text.split('\n', 1)[0].split(',')]
+        skiprows = 0
+    except ValueError:
+        skiprows = 1
+    data = np.loadtxt(io.StringIO(text), delimiter=',', skiprows=skiprows, ndmin=2)
+    if data.shape[1] >= 2:
+        return data[:, 0], data[:, 1]
+    return None, data[:, 0]
+
+def _format_of(source, fmt):
+    if fmt is not None:
+        return fmt
+    name = source if _is_path(source) else getattr(source, 'name', '')
+    extension = os.path.splitext(str(name))[1].lower().lstrip('.')
+    return 'raw' if extension in ('bin', 'pcm', 'f32') else extension
+
+def load_signal(source, fmt=None, Fs=None, is_discrete=True, raw_dtype=np.float32, lazy=False):
+    """
+    Loads a recording from a path or an uploaded file-like object and returns a Signal that
+    wraps the (memory-mapped) samples. `Fs` sets the time axis when the file has none of its own;
+    a file with a time axis (or a WAV header) always supplies its own rate.
+    """
+    fmt = _format_of(source, fmt)
+    t = None
+    if fmt == 'wav':
+        x, Fs = load_wav(source)
+    elif fmt == 'npy':
+        t, x = load_npy(source)
+    elif fmt == 'csv':
+        t, x = load_csv(source)
+    elif fmt == 'raw':
+        x = load_raw(source, dtype=raw_dtype)
+    else:
+        raise ValueError(f"Unsupported file format '{fmt}'. Choose from {FORMATS}.")
+
+    if t is not None and len(t) > 1:
+        spacing = float(t[-1] - t[0]) / (len(t) - 1)
+        if spacing <= 0:
+            raise ValueError(f"The time axis in the '{fmt}' data must be increasing.")
+        Fs = 1 / spacing # The file's own rate, so playback and export match its time axis
+    if not Fs:
+        raise ValueError(f"A sampling rate (Fs) is required to build a time axis for '{fmt}' data.")
+    return Signal.from_samples(x, Fs, is_discrete=is_discrete, t=t, lazy=lazy)
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+# This file contains the background job runner used to keep heavy operations (scaling,
+# resampling, statistics) off the Streamlit script thread. Jobs run on a shared thread pool;
+# NumPy and SciPy release the GIL in their inner loops, and results stay in-process, so they
+# can go straight into the signal store. Long loops call checkpoint() between chunks, which
+# reports progress and stops a cancelled job there; outside a job it does nothing.
+
+MAX_WORKERS = int(os.environ.get('WAVESCALER_WORKERS', os.cpu_count() or 1))
+
+_local = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+class Cancelled(Exception):
+    """Raised inside a job at its next checkpoint after it has been cancelled."""
+
+class Job:
+    """
+    A submitted computation. `key` identifies the inputs it was started for, so a finished
+    result can be checked against the current parameters before it is applied; `context`
+    carries whatever else the caller needs at that point.
+    """
+    __slots__ = ('key', 'label', 'context', 'progress', 'cancelled', 'future', 'started', 'finished')
+
+    def __init__(self, key, label, context):
+        self.key = key
+        self.label = label
+        self.context = context
+        self.progress = 0.0 # Fraction done, as last reported by checkpoint()
+        self.cancelled = False
+        self.future = None
+        self.started = self.finished = None # perf_counter() times on the worker thread
+
+    def cancel(self):
+        """Stops the job before it starts, or at its next checkpoint if it is running."""
+        self.cancelled = True
+        self.future.cancel()
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    @property
+    def seconds(self):
+        """Time the job spent running, excluding its wait in the queue; None until it has run."""
+        return None if self.finished is None else self.finished - self.started
+
+    def result(self):
+        """Returns the job's result, re-raising its exception; a cancelled job raises Cancelled."""
+        try:
+            return self.future.result()
+        except CancelledError:
+            raise Cancelled(self.key) from None
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='wavescaler-job')
+        return _executor
+
+def _run(job, compute):
+    _local.job = job
+    job.started = time.perf_counter()
+    try:
+        checkpoint()
+        return compute()
+    finally:
+        job.finished = time.perf_counter()
+        _local.job = None
+
+def submit(key, compute, label="", context=None):
+    """Runs `compute()` on the shared pool and returns its Job."""
+    job = Job(key, label, context)
+    job.future = _pool().submit(_run, job, compute)
+    return job
+
+def checkpoint(fraction=None):
+    """Records the running job's progress and raises Cancelled if it has been cancelled. A no-op outside a job."""
+    job = getattr(_local, 'job', None)
+    if job is None:
+        return
+    if job.cancelled:
+        raise Cancelled(job.key)
+    if fraction is not None:
+        job.progress = min(1.0, max(0.0, float(fraction)))
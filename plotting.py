@@ -1,11 +1,45 @@
+import base64
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
 from signal_class import Signal
+from downsampling import MinMaxPyramid
 
-def plot_signal(signal: Signal, title: str):
-    """Plots the signal object using Plotly for interactivity."""
+MAX_POINTS = 4000 # Upper bound on points sent to the browser per trace
+STEM_THRESHOLD = 1500 # Stems and markers are only drawn when this few samples are in view
+GL_THRESHOLD = 1000 # Traces with more points than this are drawn with WebGL (Scattergl)
+
+# --- Chart Transport ---
+# Trace data goes to the browser as base64 typed arrays rather than JSON number lists:
+# samples as float32, and times as float32 too unless that would blur neighbouring samples.
+# Figures are deterministic, so an unchanged chart serializes to the same bytes every rerun.
+# Only the parts of 'plotly_white' that 2-D line charts use; the full template carries ~7 KB
+# of settings for other chart types in every figure
+COMPACT_TEMPLATE = go.layout.Template(layout={key: pio.templates['plotly_white'].layout[key] for key in (
+    'colorway', 'font', 'hovermode', 'hoverlabel', 'paper_bgcolor', 'plot_bgcolor', 'xaxis', 'yaxis', 'annotationdefaults', 'title')})
+
+def typed_array(values, dtype='f4'):
+    """Encodes an array as a plotly.js typed-array spec of little-endian `dtype` ('f4' or 'f8')."""
+    data = np.ascontiguousarray(values, dtype='<' + dtype)
+    return {'dtype': dtype, 'bdata': base64.b64encode(data.tobytes()).decode('ascii')}
+
+def time_array(t, resolution):
+    """Encodes times as float32 when its rounding error stays well below `resolution` (the sample spacing), else float64."""
+    largest = float(np.max(np.abs(t))) if len(t) else 0.0
+    return typed_array(t, 'f4' if largest * 2.0 ** -24 < resolution / 10 else 'f8')
+
+def _scatter_class(num_points):
+    """SVG Scatter for small traces; Scattergl, which draws large ones much faster, above GL_THRESHOLD."""
+    return go.Scattergl if num_points > GL_THRESHOLD else go.Scatter
+
+def plot_signal(signal: Signal, title: str, x_range=None, max_points=MAX_POINTS):
+    """
+    Plots the signal object using Plotly for interactivity.
+    Large signals are drawn from the signal's min/max pyramid, so at most `max_points`
+    points per trace are rendered for the visible `x_range` (t_start, t_end).
+    """
     fig = go.Figure()
-    if signal is None or signal.x is None or signal.t is None or len(signal.x) == 0:
+    if signal is None or signal.x is None or len(signal.x) == 0:
         fig.update_layout(
             xaxis_visible=False,
             yaxis_visible=False,
@@ -13,13 +47,20 @@ def plot_signal(signal: Signal, title: str):
         )
         return fig
 
-    # Unpack data from the signal object
-    t, x, is_discrete = signal.t, signal.x, signal.is_discrete
+    # Unpack data from the signal object; only the plotted samples' times are computed
+    x, is_discrete = signal.x, signal.is_discrete
+    t_first, t_last, n = signal.time_span()
+
+    # Pick the level of detail that fits the visible window
+    start, stop = signal.sample_range(x_range)
+    idx = signal.pyramid().query(start, stop, max_points)
+    t_view, x_view = signal.times(idx), x[idx]
+    resolution = (t_last - t_first) / (n - 1) if n > 1 else 1.0
 
     # Add an invisible trace to set the initial Y-axis range without locking it.
-    if t is not None and len(t) > 1:
+    if n > 1:
         fig.add_trace(go.Scatter(
-            x=[t[0], t[-1]], 
+            x=[t_first, t_last], 
             y=[-5.5, 5.5], 
             mode='markers', 
             marker={'opacity': 0}, # Invisible markers
@@ -27,34 +68,21 @@ def plot_signal(signal: Signal, title: str):
             hoverinfo='none'
         ))
         
-    if is_discrete:
-        # --- EFFICIENT STEM PLOTTING ---
-        # Create coordinates for all stems at once.
-        # Inserts None between each line segment to break the path.
-        t_stems = np.repeat(t, 3)
-        t_stems[2::3] = None # Gaps
-        
-        y_stems = np.zeros_like(t_stems)
-        y_stems[1::3] = x # The tip of the stem
-
-        # Plot all stems with one trace
-        fig.add_trace(go.Scatter(
-            x=t_stems, y=y_stems, 
-            mode='lines', 
-            line=dict(color='royalblue', width=2),
-            hoverinfo='none' # Hide hover info for the stem lines
-        ))
-
-        # Add markers on top
-        fig.add_trace(go.Scatter(
-            x=t, y=x, 
-            mode='markers', 
+    if is_discrete and stop - start <= STEM_THRESHOLD:
+        # --- COMPACT STEM PLOTTING ---
+        # Each stem is an error bar from its marker to zero, so only the samples and two
+        # bar lengths are sent, with no repeated, gap-separated line geometry.
+        fig.add_trace(_scatter_class(len(idx))(
+            x=time_array(t_view, resolution), y=typed_array(x_view),
+            mode='markers',
             marker=dict(color="royalblue", size=6),
+            error_y=dict(type='data', symmetric=False, array=typed_array(np.maximum(-x_view, 0)), arrayminus=typed_array(np.maximum(x_view, 0)),
+                         width=0, thickness=2, color='royalblue'),
             name='Sample' # Name for hover label
         ))
 
-    else: # Continuous Signal
-        fig.add_trace(go.Scatter(x=t, y=x, mode='lines', line=dict(color="royalblue")))
+    else: # Continuous Signal, or a discrete signal zoomed out too far for stems
+        fig.add_trace(_scatter_class(len(idx))(x=time_array(t_view, resolution), y=typed_array(x_view), mode='lines', line=dict(color="royalblue")))
     
     xlabel = "Time (s)"
     fig.update_layout(
@@ -63,10 +91,73 @@ def plot_signal(signal: Signal, title: str):
         yaxis_title="Amplitude",
         showlegend=False,
         margin=dict(l=40, r=20, t=40, b=40),
-        template="plotly_white"
+        template=COMPACT_TEMPLATE
     )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
     fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='LightGray')
     fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='LightGray', zeroline=True, zerolinewidth=2, zerolinecolor='Black')
 
     return fig
 
+def plot_bank(bank, title: str, max_points=MAX_POINTS):
+    """
+    Overlays every row of a SignalBank as one line trace, with a legend of the row labels.
+    The `max_points` budget is split across the rows, each decimated by its own min/max pyramid.
+    """
+    fig = go.Figure()
+    points_per_row = max(200, max_points // max(1, len(bank)))
+    for i, label in enumerate(bank.labels):
+        n = int(bank.lengths[i])
+        idx = MinMaxPyramid(bank.x[i, :n]).query(0, n, points_per_row)
+        fig.add_trace(_scatter_class(len(idx))(x=time_array(bank.t0[i] + idx * bank.dt[i], bank.dt[i]), y=typed_array(bank.x[i, idx]), mode='lines', name=label))
+
+    fig.update_layout(
+        title=dict(text=title, x=0.5),
+        xaxis_title="Time (s)",
+        yaxis_title="Amplitude",
+        showlegend=True,
+        margin=dict(l=40, r=20, t=40, b=40),
+        template=COMPACT_TEMPLATE
+    )
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='LightGray')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='LightGray', zeroline=True, zerolinewidth=2, zerolinecolor='Black')
+    return fig
+
+def plot_spectrum(signal: Signal, title: str, max_points=MAX_POINTS):
+    """
+    Plots the signal's cached one-sided spectrum: magnitude, and below it phase when the
+    spectrum is a full transform. Bins are decimated with a min/max pyramid like the time plot.
+    """
+    spectrum = signal.spectrum() if signal is not None else None
+    if spectrum is None:
+        fig = go.Figure()
+        fig.update_layout(
+            xaxis_visible=False,
+            yaxis_visible=False,
+            annotations=[{"text": "No Spectrum", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 20}}]
+        )
+        return fig
+
+    from plotly.subplots import make_subplots # Only the spectrum view needs subplots
+    phase = spectrum.phase
+    fig = make_subplots(rows=2 if phase is not None else 1, cols=1, shared_xaxes=True, vertical_spacing=0.08)
+    magnitude = spectrum.magnitude
+    idx = MinMaxPyramid(magnitude).query(0, len(magnitude), max_points)
+    freqs = typed_array(idx * spectrum.df)
+    fig.add_trace(_scatter_class(len(idx))(x=freqs, y=typed_array(magnitude[idx]), mode='lines', line=dict(color="royalblue"), name='Magnitude'), row=1, col=1)
+    fig.update_yaxes(title_text="Magnitude", row=1, col=1)
+    if phase is not None:
+        fig.add_trace(_scatter_class(len(idx))(x=freqs, y=typed_array(phase[idx]), mode='lines', line=dict(color="darkorange"), name='Phase'), row=2, col=1)
+        fig.update_yaxes(title_text="Phase (rad)", range=[-np.pi, np.pi], row=2, col=1)
+
+    fig.update_layout(
+        title=dict(text=title, x=0.5),
+        showlegend=False,
+        margin=dict(l=40, r=20, t=40, b=40),
+        template=COMPACT_TEMPLATE
+    )
+    fig.update_xaxes(title_text="Frequency (Hz)", row=2 if phase is not None else 1, col=1)
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='LightGray')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='LightGray')
+    return fig
@@ -0,0 +1,156 @@
+import time
+from fractions import Fraction
+import numpy as np
+import jobs
+from spectrum import fourier_resample
+
+# This file contains the resampling engine behind Signal.scale_time.
+
+CHUNK_SIZE = 65536 # Output samples evaluated per chunk; bounds the scratch memory of the 'linear' and 'sinc' modes
+SINC_HALF_WIDTH = 8 # Zero crossings on each side of the windowed-sinc kernel
+MAX_DENOMINATOR = 1000 # Largest up/down factor tried by the polyphase mode
+DEFAULT_MODE = 'linear'
+
+def _sample_positions(t, t_query):
+    """Maps query times to fractional sample indices, assuming a uniform time axis."""
+    dt = (t[-1] - t[0]) / (len(t) - 1)
+    return (t_query - t[0]) / dt
+
+def _linear(t, x, t_query, state):
+    """Piecewise-linear interpolation. Fastest, but attenuates high frequencies and aliases on decimation."""
+    return np.interp(t_query, t, x, left=0, right=0)
+
+def _sinc(t, x, t_query, state):
+    """Windowed-sinc (Lanczos) interpolation with an anti-aliasing cutoff when decimating. Slowest, most accurate."""
+    cutoff, half_width = state['cutoff'], state['half_width']
+    pos = _sample_positions(t, t_query)
+    base = np.floor(pos).astype(np.int64)
+    taps = base[:, None] + np.arange(-half_width + 1, half_width + 1)
+    dist = pos[:, None] - taps
+    weights = cutoff * np.sinc(cutoff * dist) * np.sinc(dist / half_width)
+
+    # Samples beyond either end count as zero, as with the linear mode
+    valid = (taps >= 0) & (taps < len(x))
+    weights[~valid] = 0
+    y = np.einsum('ij,ij->i', weights, x[np.clip(taps, 0, len(x) - 1)])
+    y[(t_query < t[0]) | (t_query > t[-1])] = 0
+    return y
+
+def _polyphase(t, x, t_query, state):
+    """Rational-factor polyphase FIR resampling, then linear lookup on the resampled grid. Fast and band-limited."""
+    if 'resampled' not in state:
+        from scipy.signal import resample_poly # scipy.signal is slow to import and only this mode needs it
+        step = state['step_samples']
+        ratio = Fraction(1 / step).limit_denominator(MAX_DENOMINATOR) if step > 0 else Fraction(1)
+        state['up'], state['down'] = ratio.numerator, ratio.denominator
+        state['resampled'] = resample_poly(x, state['up'], state['down'])
+    y = state['resampled']
+    pos = _sample_positions(t, t_query) * state['up'] / state['down']
+    return np.interp(pos, np.arange(len(y)), y, left=0, right=0)
+
+def _fourier(t, x, t_query, state):
+    """Frequency-domain resampling (see spectrum.fourier_resample), then linear lookup on the resampled grid. Band-limited; assumes a periodic signal."""
+    if 'resampled' not in state:
+        state['ratio'], state['resampled'] = fourier_resample(x, state['step_samples'], state['spectrum'])
+    y = state['resampled']
+    pos = _sample_positions(t, t_query) * state['ratio']
+    return np.interp(pos, np.arange(len(y)), y, left=0, right=0)
+
+MODES = {
+    'linear': _linear,
+    'polyphase': _polyphase,
+    'sinc': _sinc,
+    'fft': _fourier,
+}
+
+def resample(t, x, start, stop, num, mode=DEFAULT_MODE, chunk_size=CHUNK_SIZE, spectrum=None):
+    """
+    Evaluates the signal (t, x) at `num` evenly spaced times from `start` to `stop` inclusive.
+    The query times are generated and evaluated chunk by chunk. For 'linear' and 'sinc' only
+    the output array grows with `num`; 'polyphase' and 'fft' first resample the whole signal
+    into one intermediate array of about `num` samples ('fft' also holds its transform), which
+    the chunks then read from. The 'polyphase', 'sinc' and 'fft' modes assume a uniform time
+    axis; 'fft' reuses the forward transform of a cached `spectrum` of x.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown resampling mode '{mode}'. Choose from {sorted(MODES)}.")
+    engine = MODES[mode]
+    out = np.empty(num, dtype=np.float32 if x.dtype == np.float32 else float)
+    step = (stop - start) / (num - 1) if num > 1 else 0.0
+
+    # Mode-specific setup shared by all chunks
+    dt = (t[-1] - t[0]) / (len(t) - 1)
+    step_samples = step / dt
+    cutoff = min(1.0, 1.0 / step_samples) if step_samples > 0 else 1.0
+    state = {'step_samples': step_samples, 'cutoff': cutoff, 'half_width': int(np.ceil(SINC_HALF_WIDTH / cutoff)), 'spectrum': spectrum}
+    if mode == 'sinc':
+        # Each output sample gathers 2 * half_width taps, so shrink the chunk to match
+        chunk_size = max(1, chunk_size // (2 * state['half_width']))
+
+    for i0 in range(0, num, chunk_size):
+        i1 = min(num, i0 + chunk_size)
+        t_query = start + step * np.arange(i0, i1)
+        if i1 == num and num > 1:
+            t_query[-1] = stop # Land exactly on the end point, like np.linspace
+        out[i0:i1] = engine(t, x, t_query, state)
+        jobs.checkpoint(i1 / num) # Progress and cancellation point when run as a background job
+    return out
+
+class StreamResampler:
+    """
+    Linear resampling of a block stream from `num_in` to `num_out` evenly spaced samples,
+    matching resample(..., mode='linear') on the whole signal. Only the last input sample
+    is carried over between blocks, so memory does not grow with the stream.
+    """
+    def __init__(self, num_in, num_out):
+        self.num_in, self.num_out = num_in, num_out
+        self.step = (num_in - 1) / (num_out - 1) if num_out > 1 else 0.0
+        self._next = 0 # Index of the next output sample
+        self._base = 0 # Global index of the first sample in the carried buffer
+        self._carry = np.empty(0)
+
+    def _position(self, j):
+        """Source positions of output samples `j`; the last one lands exactly on the end point."""
+        pos = j * self.step
+        pos[j == self.num_out - 1] = self.num_in - 1
+        return pos
+
+    def process(self, block):
+        """Consumes a block of input samples and returns every output sample it completes."""
+        buf = np.concatenate((self._carry, block)) if len(self._carry) else np.asarray(block)
+        if len(buf) == 0:
+            return buf
+        last = self._base + len(buf) - 1 # Global index of the newest available sample
+        if last >= self.num_in - 1:
+            stop = self.num_out
+        else:
+            stop = min(self.num_out, int(last / self.step) + 1) if self.step > 0 else self.num_out
+            if stop > self._next and (stop - 1) * self.step > last:
+                stop -= 1 # Rounding in last / step can overshoot by one sample
+        j = np.arange(self._next, stop)
+        y = np.interp(self._position(j) - self._base, np.arange(len(buf)), buf, left=0, right=0)
+        self._next, self._base, self._carry = stop, last, buf[-1:]
+        return y.astype(np.float32 if buf.dtype == np.float32 else float, copy=False)
+
+def compare_modes(x, factor, modes=None, repeats=3):
+    """
+    Reports the error-versus-speed tradeoff of each resampling mode on the samples `x`.
+    Each mode rescales by `factor` and back again; the error is the round-trip RMS error
+    relative to the RMS of `x`, and the time is the best of `repeats` forward passes.
+    """
+    x = np.asarray(x, dtype=float)
+    t = np.arange(len(x), dtype=float)
+    num = max(2, int(len(x) / factor))
+    rms = np.sqrt(np.mean(x ** 2)) or 1.0
+    report = []
+    for mode in modes or MODES:
+        seconds = np.inf
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            y = resample(t, x, t[0], t[-1], num, mode)
+            seconds = min(seconds, time.perf_counter() - start_time)
+        t_y = np.linspace(t[0], t[-1], num)
+        x_back = resample(t_y, y, t[0], t[-1], len(x), mode)
+        error = np.sqrt(np.mean((x_back - x) ** 2)) / rms
+        report.append({'mode': mode, 'seconds': seconds, 'relative_rms_error': float(error)})
+    return report
@@ -1,68 +1,308 @@
 import numpy as np
-from scipy.interpolate import interp1d
 import copy
+import hashlib
+from downsampling import MinMaxPyramid, visible_range
+from resampling import resample, DEFAULT_MODE
+from stats import compute_stats, summarize
+from spectrum import compute_spectrum
 
 class Signal:
     """
     A class to represent a signal, containing its data and methods for manipulation and analysis.
     """
-    def __init__(self, t, x, is_discrete, f=None, Fs=None):
-        self.t = np.array(t, dtype=float) if t is not None else None
-        self.x = np.array(x, dtype=float) if x is not None else None
+    __slots__ = ('is_discrete', 'f', 'Fs', 'lazy', '_t', '_t0', '_dt', '_x', '_source', '_pending', '_pyramid', '_stats', '_fingerprint', '_spectrum', '_generator')
+
+    def __init__(self, t, x, is_discrete, f=None, Fs=None, lazy=False, dtype=float, compact=False, generator=None):
+        self._x = np.array(x, dtype=dtype) if x is not None else None
+        self._t, self._t0, self._dt = None, None, None
+        if t is not None:
+            t = np.asarray(t, dtype=float)
+            if compact and len(t) > 1:
+                self._set_time(t)
+            else:
+                self._t = np.array(t)
         self.is_discrete = is_discrete
         self.f = f
         self.Fs = Fs
+        self.lazy = lazy # When True, scaling is recorded and only applied when the data is read
+        self._source = None # Signal that the pending scaling is applied to
+        self._pending = None # (amplitude factor, time factor, resampling mode)
+        self._pyramid = None # Level-of-detail cache, built on first plot
+        self._stats = None # Numeric statistics cache, filled by calculate_stats
+        self._fingerprint = None # Content hash cache, filled by fingerprint
+        self._spectrum = None # Spectrum cache, filled by spectrum
+        self._generator = generator # signal_generation.Generator of a generated signal, so scaling can re-synthesize it
+
+    @classmethod
+    def from_samples(cls, x, Fs, is_discrete=True, t=None, t0=0.0, f=None, lazy=False):
+        """
+        Wraps existing sample data, such as a memory map, without copying it.
+        Without `t`, the time axis is implicit: t0 + n / Fs. The wrapped data is read-only.
+        """
+        signal = cls(None, None, is_discrete, f=f, Fs=Fs, lazy=lazy)
+        signal._x = x.view()
+        signal._x.flags.writeable = False # A read-only view leaves the caller's array untouched
+        if t is not None and len(t) > 1:
+            signal._set_time(np.asarray(t, dtype=float))
+        elif t is not None:
+            signal._t = np.asarray(t, dtype=float)
+        else:
+            signal._t0, signal._dt = float(t0), 1.0 / Fs
+        return signal
+
+    # --- Data Access ---
+    # Reading t or x applies any deferred scaling first. A compact signal keeps only
+    # the start time and step of its uniform time axis and rebuilds t on demand.
+    @property
+    def t(self):
+        self._materialize()
+        if self._t is None and self._dt is not None:
+            return self._t0 + np.arange(len(self._x)) * self._dt
+        return self._t
+
+    @t.setter
+    def t(self, value):
+        self._materialize()
+        self._t, self._t0, self._dt = value, None, None
+        self._source, self._pending, self._pyramid, self._stats, self._fingerprint = None, None, None, None, None
+        self._spectrum, self._generator = None, None
+
+    @property
+    def x(self):
+        self._materialize()
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._materialize()
+        self._x, self._source, self._pending = value, None, None
+        self._pyramid, self._stats, self._fingerprint, self._spectrum = None, None, None, None
+        self._generator = None # Arbitrary new data no longer follows the closed form
+
+    @property
+    def is_compact(self):
+        """True if the time axis is stored as a start time and step instead of an array."""
+        return self._dt is not None
+
+    @property
+    def nbytes(self):
+        """Bytes held by the signal's own arrays (deferred signals hold none until read)."""
+        return sum(arr.nbytes for arr in (self._t, self._x) if arr is not None)
+
+    @property
+    def cache_nbytes(self):
+        """Bytes held by the derived pyramid and spectrum caches, which are dropped with the data."""
+        return sum(cache.nbytes for cache in (self._pyramid, self._spectrum) if cache is not None)
+
+    def _set_time(self, t):
+        """Stores a uniform time axis as (t0, dt) and anything else as an explicit array."""
+        t0, dt = float(t[0]), float(t[-1] - t[0]) / (len(t) - 1)
+        if np.allclose(t, t0 + np.arange(len(t)) * dt, rtol=0, atol=abs(dt) * 1e-6):
+            self._t, self._t0, self._dt = None, t0, dt
+        else:
+            self._t, self._t0, self._dt = np.array(t), None, None
+
+    def _time_span(self):
+        """Returns (first time, last time, number of samples) without building the time axis."""
+        n = len(self._x)
+        if self._dt is not None:
+            return self._t0, self._t0 + (n - 1) * self._dt, n
+        return self._t[0], self._t[-1], n
+
+    def time_span(self):
+        """Returns (first time, last time, number of samples) without building the time axis; (None, None, 0) without data."""
+        self._materialize()
+        if self._x is None or len(self._x) == 0:
+            return None, None, 0
+        return self._time_span()
+
+    def times(self, idx):
+        """Returns the times of the samples at indices `idx`, computing only those for a compact time axis."""
+        self._materialize()
+        return self._t0 + np.asarray(idx) * self._dt if self.is_compact else self._t[idx]
+
+    def sample_range(self, x_range=None):
+        """
+        Returns the [start, stop) sample range for an optional (t_start, t_end) window, as
+        downsampling.visible_range does; a compact time axis is solved directly instead of searched.
+        """
+        self._materialize()
+        n = len(self._x)
+        if x_range is None:
+            return 0, n
+        if not self.is_compact or self._dt <= 0:
+            return visible_range(self.t, x_range)
+        time_at = lambda i: self._t0 + i * self._dt # Rounds exactly like the t property
+        start = int(np.clip(np.ceil((x_range[0] - self._t0) / self._dt), 0, n)) # First sample at or after t_start
+        stop = int(np.clip(np.floor((x_range[1] - self._t0) / self._dt) + 1, 0, n)) # Past the last sample at or before t_end
+        # The division can round across a sample that lies exactly on the window's edge
+        if start > 0 and time_at(start - 1) >= x_range[0]: start -= 1
+        elif start < n and time_at(start) < x_range[0]: start += 1
+        if stop < n and time_at(stop) <= x_range[1]: stop += 1
+        elif stop > 0 and time_at(stop - 1) > x_range[1]: stop -= 1
+        return max(0, start - 1), min(n, stop + 1)
+
+    def _materialize(self):
+        """Applies the fused pending scaling to the source data in a single resample and multiply."""
+        if self._pending is None or self._x is not None:
+            return
+        amp, factor, mode = self._pending
+        scaled = self._source._scale_time_now(factor, mode)
+        self._t, self._t0, self._dt, x = scaled._t, scaled._t0, scaled._dt, scaled._x
+        if amp != 1.0:
+            if x.flags.writeable:
+                x *= amp # x is freshly resampled, so it can be scaled in place
+            else:
+                x = x * amp # x is still shared with the source
+        self._x = x
+
+    def _has_data(self):
+        """True if the signal holds samples, without applying any deferred scaling."""
+        return self._x is not None or (self._source is not None and self._source._x is not None)
+
+    def _defer(self, amp=1.0, factor=1.0, mode=None):
+        """Returns a new lazy Signal with the given scaling folded into the pending operations."""
+        new_signal = self.copy()
+        if self._pending is None:
+            new_signal._source = self.copy()
+            pending_amp, pending_factor, pending_mode = 1.0, 1.0, DEFAULT_MODE
+        else:
+            pending_amp, pending_factor, pending_mode = self._pending
+        new_signal._pending = (pending_amp * amp, pending_factor * factor, mode or pending_mode)
+        new_signal._t = new_signal._t0 = new_signal._dt = new_signal._x = None
+        new_signal._pyramid = new_signal._stats = new_signal._fingerprint = new_signal._spectrum = None
+        if self._generator is not None:
+            new_signal._generator = self._generator.scaled(amp, factor)
+
+        # Update frequency if it exists
+        if new_signal.f:
+            new_signal.f *= factor
+        return new_signal
 
     def copy(self):
-        """Returns a deep copy of the signal object to prevent unintended modifications."""
-        return copy.deepcopy(self)
+        """
+        Returns a copy of the signal object that shares its arrays copy-on-write.
+        Shared arrays are made read-only, so neither signal can modify the other's data;
+        writers assign a new array through the t or x setters instead.
+        """
+        for arr in (self._t, self._x):
+            if arr is not None:
+                arr.flags.writeable = False
+        return copy.copy(self) # The caches describe the same data, so they are shared too
+
+    def with_arrays(self, x=None, t=None):
+        """
+        Returns a materialized copy, detached from any deferred-scaling source, that is backed by
+        `x` and, for an explicit time axis, `t` (by default its own arrays). Replacements must hold
+        the same values, e.g. memory maps of a copy on disk, so the statistics and fingerprint
+        caches carry over; a replaced signal's pyramid and spectrum are rebuilt on demand.
+        """
+        self._materialize()
+        new_signal = self.copy()
+        new_signal._source, new_signal._pending = None, None
+        if x is not None:
+            new_signal._x, new_signal._pyramid, new_signal._spectrum = x, None, None
+        if t is not None and not self.is_compact:
+            new_signal._t = t
+        return new_signal
+
+    def iter_blocks(self, chunk_size=65536):
+        """Yields (t, x) blocks of at most `chunk_size` samples; a compact time axis is built per block."""
+        x = self.x
+        for i in range(0, len(x), chunk_size):
+            block = x[i:i + chunk_size]
+            if self.is_compact:
+                yield self._t0 + np.arange(i, i + len(block)) * self._dt, block
+            else:
+                yield self._t[i:i + chunk_size], block
+
+    def fingerprint(self):
+        """Returns a content hash of the samples, time axis and sampling rate, computed once."""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            x = self.x
+            if x is not None:
+                digest.update(f"{x.dtype.str}|{self._time_span() if len(x) else ''}|{self.is_discrete}|{self.Fs}".encode())
+                digest.update(np.ascontiguousarray(x).view(np.uint8))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def pyramid(self):
+        """Returns the min/max level-of-detail pyramid for the signal, building it once."""
+        if self._pyramid is None and self.x is not None:
+            self._pyramid = MinMaxPyramid(self.x)
+        return self._pyramid
+
+    def spectrum(self):
+        """Returns the signal's one-sided Spectrum (see spectrum.py), computing it once; None for fewer than 2 samples."""
+        if self._spectrum is None and self.x is not None and len(self.x) > 1:
+            t_start, t_end, n = self._time_span()
+            self._spectrum = compute_spectrum(self._x, (t_end - t_start) / (n - 1))
+        return self._spectrum
 
     def scale_amplitude(self, factor):
         """
         Performs amplitude scaling.
         Returns a new, scaled Signal object.
         """
+        if self.lazy and self._has_data():
+            return self._defer(amp=factor)
         new_signal = self.copy()
         if new_signal.x is not None:
-            new_signal.x *= factor
+            new_signal.x = new_signal.x * factor
+            if self._generator is not None:
+                new_signal._generator = self._generator.scaled(amp=factor)
         return new_signal
 
-    def scale_time(self, factor):
+    def scale_time(self, factor, mode=DEFAULT_MODE):
         """
         Performs time scaling.
         Returns a new, time-scaled Signal object.
+        `mode` selects the resampling engine: 'linear', 'polyphase', 'sinc' or the frequency-domain
+        'fft', which reuses the cached spectrum (see resampling.py). Generated waveforms skip
+        resampling: their samples are re-synthesized exactly from the closed form.
         """
+        if self.lazy and self._has_data():
+            return self._defer(factor=factor, mode=mode)
+        return self._scale_time_now(factor, mode)
+
+    def _scale_time_now(self, factor, mode):
+        """Resamples (or re-synthesizes) the signal's data immediately; see scale_time."""
+        self._materialize()
+        if factor == 1.0 or self._x is None or len(self._x) < 2:
+            return self.copy()
         new_signal = self.copy()
-        if factor == 1.0 or new_signal.t is None or new_signal.x is None or len(new_signal.t) < 2:
-            return new_signal
+        new_signal._pyramid = None
 
-        t_original_duration = new_signal.t[-1] - new_signal.t[0]
+        t_start, t_end, n = self._time_span()
+        t_original_duration = t_end - t_start
         t_new_duration = t_original_duration / factor
-        
-        if self.is_discrete:
-            MAX_SAMPLES = 250000
-            num_original_samples = len(self.x)
-            num_new_samples = int(num_original_samples / factor)
-
-            # Safety cap to prevent freezing
-            if num_new_samples > MAX_SAMPLES:
-                # THE FIX: Removed the st.warning() call. The capping happens silently.
-                num_new_samples = MAX_SAMPLES
-            
-            if num_new_samples < 2:
-                new_signal.t = np.array([self.t[0]])
-                new_signal.x = np.array([self.x[0]])
-                return new_signal
-            
-            t_new = np.linspace(self.t[0], t_new_duration, num_new_samples)
-            f_interp = interp1d(self.t, self.x, kind='linear', bounds_error=False, fill_value=0)
-            x_new = f_interp(np.linspace(self.t[0], t_original_duration, num_new_samples))
-            new_signal.t, new_signal.x = t_new, x_new
-        else: # Continuous
-            t_new = np.linspace(self.t[0], t_new_duration, len(self.t))
-            f_interp = interp1d(self.t, self.x, kind='linear', bounds_error=False, fill_value=0)
-            x_new = f_interp(t_new * factor)
-            new_signal.t, new_signal.x = t_new, x_new
+        num_new_samples = int(n / factor) if self.is_discrete else n
+
+        if num_new_samples < 2:
+            new_signal.t = np.array([t_start])
+            new_signal.x = np.array([self._x[0]])
+            return new_signal
+
+        # A generated signal scaled to x(factor * t) is the same closed form with its time scale
+        # multiplied, so its samples are evaluated exactly on the new axis (which starts at 0)
+        generator = self._generator.scaled(factor=factor) if self._generator is not None and t_start == 0 else None
+        if generator is not None:
+            x_new = generator.synthesize(num_new_samples, (t_new_duration - t_start) / (num_new_samples - 1), self._x.dtype)
+        else:
+            t = self.t
+            spectrum = self.spectrum() if mode == 'fft' else None # Cached, so rescaling the same signal skips the forward FFT
+            if self.is_discrete:
+                x_new = resample(t, self._x, t_start, t_original_duration, num_new_samples, mode, spectrum=spectrum)
+            else: # Continuous
+                x_new = resample(t, self._x, t_start * factor, t_new_duration * factor, n, mode, spectrum=spectrum)
+
+        if self.is_compact:
+            new_signal.x = x_new
+            new_signal._t, new_signal._t0, new_signal._dt = None, t_start, (t_new_duration - t_start) / (num_new_samples - 1)
+        else:
+            new_signal.t, new_signal.x = np.linspace(t_start, t_new_duration, num_new_samples), x_new
+        new_signal._generator = generator
         
         # Update frequency if it exists
         if new_signal.f:
@@ -71,33 +311,21 @@ class Signal:
         return new_signal
 
     def calculate_stats(self):
-        """Calculates key statistics for the signal and returns them as a dictionary."""
-        stats = {}
-        if self.x is None or len(self.x) == 0 or self.t is None or len(self.t) == 0:
-            return { 'Max': 'N/A', 'Min': 'N/A', 'Mean': 'N/A', 'RMS': 'N/A', 'Power': 'N/A', 'Energy': 'N/A', 'Period': 'N/A', 'Classification': 'N/A'}
-
-        stats['Max'] = f"{np.max(self.x):.3f}"
-        stats['Min'] = f"{np.min(self.x):.3f}"
-        stats['Mean'] = f"{np.mean(self.x):.3f}"
-        stats['RMS'] = f"{np.sqrt(np.mean(self.x**2)):.3f}"
-        
-        duration = self.t[-1] - self.t[0] if len(self.t) > 1 else 1.0
-        
-        if self.is_discrete:
-            energy = np.sum(np.abs(self.x)**2)
-            stats['Classification'] = "Discrete"
-        else:
-            dt = self.t[1] - self.t[0] if len(self.t) > 1 else 1.0
-            energy = np.sum(np.abs(self.x)**2) * dt
-            stats['Classification'] = "Continuous"
-            
-        stats['Energy'] = f"{energy:.3f}"
-        stats['Power'] = f"{energy / duration:.3f}" if duration > 0 else "N/A"
-        
-        if self.f and self.f > 0:
-            stats['Period'] = f"{1/self.f:.3f} s"
-        else:
-            stats['Period'] = "Aperiodic"
-            
-        return stats
+        """
+        Calculates key statistics for the signal and returns them as a dictionary of numbers.
+        The data-derived values come from one chunked pass and are cached until the data changes.
+        'Period' is None for aperiodic signals; every value is None for an empty signal.
+        """
+        if self.x is None or len(self.x) == 0:
+            return {'Max': None, 'Min': None, 'Mean': None, 'RMS': None, 'Power': None, 'Energy': None, 'Period': None, 'Classification': None}
+
+        if self._stats is None:
+            t_start, t_end, n = self._time_span()
+            duration = t_end - t_start if n > 1 else 1.0
+            dt = (self._dt if self.is_compact else self._t[1] - self._t[0]) if n > 1 else 1.0
+            self._stats = summarize(compute_stats(self._x), self.is_discrete, dt, duration)
 
+        stats = dict(self._stats)
+        stats['Period'] = 1 / self.f if self.f and self.f > 0 else None
+        stats['Classification'] = "Discrete" if self.is_discrete else "Continuous"
+        return stats
@@ -1,51 +1,170 @@
+import io
 import numpy as np
+import jobs
 
-def generate_signal(sig_type, A, f, phi, Fs, duration=2.0, custom_data=None):
+# --- Waveform Registry ---
+# Each kernel writes A * waveform(t) into `out` in place, reusing `out` as the
+# phase-argument buffer. Parameters may be scalars or broadcastable arrays.
+WAVEFORMS = {}
+DISCRETE_TYPES = {'Custom Discrete'}
+
+def register_waveform(name, sampled=True):
     """
-    Generates a continuous or discrete signal based on user parameters.
+    Decorator that registers a waveform kernel under `name`.
+    With `sampled=True` the same kernel is also registered as the discrete 'Sampled <name>' type.
     """
-    is_discrete = sig_type in ['Sampled Sine', 'Sampled Cosine', 'Sampled Exponential', 
-                               'Sampled Triangular', 'Sampled Sawtooth', 'Custom Discrete']
+    def decorator(kernel):
+        WAVEFORMS[name] = kernel
+        if sampled:
+            WAVEFORMS[f"Sampled {name}"] = kernel
+            DISCRETE_TYPES.add(f"Sampled {name}")
+        return kernel
+    return decorator
 
-    if is_discrete:
-        n_samples = int(duration * Fs)
-        t = np.arange(n_samples) / Fs
-    else:
-        points_per_cycle = 50
-        num_points = max(1000, int(duration * f * points_per_cycle))
-        num_points = min(50000, num_points) 
-        t = np.linspace(0, duration, num_points, endpoint=False)
-    
-    # Apply phase shift to time vector
-    t_phased = t + np.deg2rad(phi) / (2 * np.pi * f) if f > 0 else t
+def _phase(t, f, phi, out):
+    """Writes the phase argument 2*pi*f*t + phi (phi in degrees) into `out`."""
+    np.multiply(t, 2 * np.pi * np.asarray(f), out=out)
+    out += np.deg2rad(phi)
+    return out
+
+@register_waveform('Sine')
+def _sine(t, A, f, phi, out):
+    np.sin(_phase(t, f, phi, out), out=out)
+    out *= A
+    return out
+
+@register_waveform('Cosine')
+def _cosine(t, A, f, phi, out):
+    np.cos(_phase(t, f, phi, out), out=out)
+    out *= A
+    return out
+
+@register_waveform('Exponential')
+def _exponential(t, A, f, phi, out):
+    # A decaying 5 Hz carrier; `f` sets the decay rate
+    np.cos(_phase(t, 5, phi, out), out=out)
+    envelope = np.multiply(t, -np.asarray(f), out=np.empty_like(out))
+    np.exp(envelope, out=envelope)
+    envelope *= A
+    out *= envelope
+    return out
+
+@register_waveform('Triangular')
+def _triangular(t, A, f, phi, out):
+    np.sin(_phase(t, f, phi, out), out=out)
+    np.arcsin(out, out=out)
+    out *= np.asarray(A) * (2 / np.pi)
+    return out
 
+@register_waveform('Sawtooth')
+def _sawtooth(t, A, f, phi, out):
     # --- THE FIX: Using a mathematically stable formula for Sawtooth wave ---
-    sawtooth_wave = A * (2 * (t_phased * f - np.floor(0.5 + t_phased * f)))
-
-    sig_map = {
-        'Sine': A * np.sin(2 * np.pi * f * t + np.deg2rad(phi)),
-        'Cosine': A * np.cos(2 * np.pi * f * t + np.deg2rad(phi)),
-        'Exponential': A * np.exp(-f * t) * np.cos(2 * np.pi * 5 * t + np.deg2rad(phi)),
-        'Triangular': A * (2 / np.pi) * np.arcsin(np.sin(2 * np.pi * f * t + np.deg2rad(phi))),
-        'Sawtooth': sawtooth_wave,
-    }
-    
-    sampled_map = {
-        'Sampled Sine': A * np.sin(2 * np.pi * f * t + np.deg2rad(phi)),
-        'Sampled Cosine': A * np.cos(2 * np.pi * f * t + np.deg2rad(phi)),
-        'Sampled Exponential': A * np.exp(-f * t) * np.cos(2 * np.pi * 5 * t + np.deg2rad(phi)),
-        'Sampled Triangular': A * (2 / np.pi) * np.arcsin(np.sin(2 * np.pi * f * t + np.deg2rad(phi))),
-        'Sampled Sawtooth': sawtooth_wave,
-    }
-
-    if sig_type in sig_map:
-        x = sig_map[sig_type]
-    elif sig_type in sampled_map:
-        x = sampled_map[sig_type]
+    # 2 * (u - floor(u + 0.5)) with u = f * (t + phase delay), written as a wrapped remainder
+    _phase(t, f, phi, out)
+    out /= 2 * np.pi
+    out += 0.5
+    np.mod(out, 1.0, out=out)
+    out -= 0.5
+    out *= 2 * np.asarray(A)
+    # Without a frequency there is no phase delay to apply, so the wave sits at zero
+    if np.any(np.asarray(f) <= 0):
+        np.multiply(out, np.asarray(f) > 0, out=out)
+    return out
+
+def waveform_names():
+    """Returns every selectable signal type: continuous waveforms, then sampled ones, then custom data."""
+    continuous = [name for name in WAVEFORMS if name not in DISCRETE_TYPES]
+    sampled = [name for name in WAVEFORMS if name in DISCRETE_TYPES]
+    return continuous + sampled + ['Custom Continuous', 'Custom Discrete']
+
+# --- Block-wise Generation ---
+# Every block builds its times from the global sample index, so consecutive blocks are
+# phase-continuous and a streamed signal matches the one-shot signal sample for sample.
+BLOCK_SIZE = 65536 # Samples per generated block
+POINTS_PER_CYCLE = 50 # Resolution of continuous waveforms
+MIN_POINTS = 1000
+
+def sample_grid(sig_type, f, Fs, duration=2.0, max_points=None):
+    """
+    Returns (number of samples, sample spacing, is_discrete) for a registered waveform.
+    Sampled types use Fs; continuous ones use POINTS_PER_CYCLE points per cycle of f,
+    optionally capped at `max_points`.
+    """
+    if sig_type in DISCRETE_TYPES:
+        return int(duration * Fs), 1.0 / Fs, True
+    num_points = max(MIN_POINTS, int(duration * f * POINTS_PER_CYCLE))
+    if max_points is not None:
+        num_points = min(max_points, num_points)
+    return num_points, duration / num_points, False
+
+def _fill_block(kernel, start, dt, A, f, phi, t_out, x_out):
+    """Writes the times and samples for the block starting at global index `start`."""
+    np.multiply(np.arange(start, start + len(t_out)), dt, out=t_out)
+    return kernel(t_out, A, f, phi, out=x_out)
+
+def iter_signal_blocks(sig_type, A, f, phi, Fs, duration=2.0, block_size=BLOCK_SIZE, max_points=None, dtype=float):
+    """
+    Yields (t, x) blocks of at most `block_size` samples for a registered waveform,
+    so arbitrarily long signals are generated in bounded memory.
+    """
+    if sig_type not in WAVEFORMS:
+        raise ValueError(f"'{sig_type}' is not a generated waveform.")
+    kernel = WAVEFORMS[sig_type]
+    n, dt, _ = sample_grid(sig_type, f, Fs, duration, max_points)
+    for start in range(0, n, block_size):
+        size = min(block_size, n - start)
+        t, x = np.empty(size), np.empty(size)
+        _fill_block(kernel, start, dt, A, f, phi, t, x)
+        yield t, x.astype(dtype, copy=False)
+
+class Generator:
+    """
+    The closed form of a generated signal: x(t) = WAVEFORMS[sig_type](time_scale * t, A, f, phi).
+    A Signal keeps one so that scaling re-synthesizes exact samples instead of interpolating,
+    however many times it is scaled.
+    """
+    __slots__ = ('sig_type', 'A', 'f', 'phi', 'time_scale')
+
+    def __init__(self, sig_type, A, f, phi, time_scale=1.0):
+        self.sig_type = sig_type
+        self.A = A
+        self.f = f
+        self.phi = phi
+        self.time_scale = time_scale
+
+    def scaled(self, amp=1.0, factor=1.0):
+        """Returns the generator of amp * x(factor * t)."""
+        return Generator(self.sig_type, self.A * amp, self.f, self.phi, self.time_scale * factor)
+
+    def synthesize(self, num_samples, dt, dtype=float, block_size=BLOCK_SIZE):
+        """Evaluates x at k * dt for k < num_samples, block by block in float64 scratch buffers."""
+        kernel = WAVEFORMS[self.sig_type]
+        x = np.empty(num_samples, dtype=dtype)
+        t_block, x_block = np.empty(min(block_size, num_samples)), np.empty(min(block_size, num_samples))
+        for start in range(0, num_samples, block_size):
+            size = min(block_size, num_samples - start)
+            _fill_block(kernel, start, dt * self.time_scale, self.A, self.f, self.phi, t_block[:size], x_block[:size])
+            x[start:start + size] = x_block[:size]
+            jobs.checkpoint((start + size) / num_samples)
+        return x
+
+def generate_signal(sig_type, A, f, phi, Fs, duration=2.0, custom_data=None, max_points=None):
+    """
+    Generates a continuous or discrete signal based on user parameters.
+    Waveforms are filled block by block into preallocated arrays; see iter_signal_blocks.
+    """
+    is_discrete = sig_type in DISCRETE_TYPES
+
+    if sig_type in WAVEFORMS:
+        # Only the selected waveform is evaluated
+        n, dt, is_discrete = sample_grid(sig_type, f, Fs, duration, max_points)
+        t, x = np.empty(n), np.empty(n)
+        for start in range(0, n, BLOCK_SIZE):
+            _fill_block(WAVEFORMS[sig_type], start, dt, A, f, phi, t[start:start + BLOCK_SIZE], x[start:start + BLOCK_SIZE])
     elif sig_type == 'Custom Continuous' or sig_type == 'Custom Discrete':
         try:
             if not custom_data or not any(char.isdigit() for char in custom_data): raise ValueError
-            x = np.array([float(v.strip()) for v in custom_data.split(',')])
+            x = np.loadtxt(io.StringIO(custom_data), delimiter=',', ndmin=2).ravel() # Vectorized C parser
             t = np.linspace(0, duration, len(x)) if sig_type == 'Custom Continuous' else np.arange(len(x)) * (duration / len(x))
         except (ValueError, AttributeError):
             return None, None, False
@@ -53,4 +172,3 @@ def generate_signal(sig_type, A, f, phi, Fs, duration=2.0, custom_data=None):
         return None, None, False
 
     return t, x, is_discrete
-
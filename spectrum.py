@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import jobs
+
+# This file contains the spectral analysis engine behind Signal.spectrum. A signal's rfft is
+# zero-padded to a fast FFT length, split across several workers and cached on the Signal.
+# Signals longer than MAX_FFT_SAMPLES get an averaged short-time spectrum instead, computed
+# over overlapping windowed blocks, so memory is bounded by the block size. scipy.fft is
+# imported on first use.
+
+FFT_WORKERS = int(os.environ.get('WAVESCALER_FFT_WORKERS', os.cpu_count() or 1))
+MAX_FFT_SAMPLES = 1 << 22 # Longest signal transformed in one piece
+STFT_BLOCK = 1 << 16 # Samples per block of a short-time spectrum
+STFT_HOP = STFT_BLOCK // 2 # 50% overlap, the usual choice for a Hann window
+STFT_BATCH = 16 # Blocks transformed per rfft call
+
+class Spectrum:
+    """
+    The one-sided amplitude spectrum of a signal: bin k is at k * df Hz, and a sinusoid of
+    amplitude A shows up as a peak of height about A. `coefficients` holds the complex rfft of
+    the whole signal zero-padded to `n_fft` samples; a block-averaged spectrum has none, and so
+    no phase either.
+    """
+    __slots__ = ('df', 'magnitude', 'coefficients', 'n', 'n_fft', 'blocks')
+
+    def __init__(self, df, magnitude, coefficients=None, n=0, n_fft=0, blocks=1):
+        self.df = df
+        self.magnitude = magnitude
+        self.coefficients = coefficients
+        self.n = n # Samples in the signal
+        self.n_fft = n_fft # Transform length
+        self.blocks = blocks # Blocks averaged; 1 for a full transform
+
+    @property
+    def freqs(self):
+        return np.arange(len(self.magnitude)) * self.df
+
+    @property
+    def phase(self):
+        """Phase of each bin in radians, or None for a block-averaged spectrum."""
+        return None if self.coefficients is None else np.angle(self.coefficients)
+
+    @property
+    def nbytes(self):
+        return self.magnitude.nbytes + (0 if self.coefficients is None else self.coefficients.nbytes)
+
+    def peak_frequency(self):
+        """Frequency of the largest non-DC bin, in Hz."""
+        if len(self.magnitude) < 2:
+            return 0.0
+        return float((1 + np.argmax(self.magnitude[1:])) * self.df)
+
+def _one_sided(magnitude, n_fft, gain):
+    """Scales |X| to amplitude: every bin except DC (and Nyquist, for even n_fft) is doubled."""
+    magnitude *= 2 * gain
+    magnitude[0] /= 2
+    if n_fft % 2 == 0:
+        magnitude[-1] /= 2
+    return magnitude
+
+def compute_spectrum(x, dt, max_fft_samples=MAX_FFT_SAMPLES, block=STFT_BLOCK, hop=STFT_HOP):
+    """Returns the Spectrum of samples `x` spaced `dt` seconds apart; see the module comment."""
+    from scipy import fft as sp_fft
+    n = len(x)
+    if n <= max_fft_samples:
+        n_fft = sp_fft.next_fast_len(n, real=True)
+        coefficients = sp_fft.rfft(x, n=n_fft, workers=FFT_WORKERS)
+        jobs.checkpoint(1.0)
+        return Spectrum(1.0 / (n_fft * dt), _one_sided(np.abs(coefficients), n_fft, 1.0 / n), coefficients, n, n_fft)
+
+    # Power-average the blocks (Welch), with one last block aligned to the end so no sample is skipped
+    window = np.hanning(block).astype(x.dtype if x.dtype == np.float32 else float)
+    starts = np.arange(0, n - block + 1, hop)
+    if starts[-1] != n - block:
+        starts = np.append(starts, n - block)
+    frames = np.lib.stride_tricks.sliding_window_view(x, block)
+    power = np.zeros(block // 2 + 1)
+    for i in range(0, len(starts), STFT_BATCH):
+        batch = frames[starts[i:i + STFT_BATCH]] * window
+        power += (np.abs(sp_fft.rfft(batch, axis=-1, workers=FFT_WORKERS)) ** 2).sum(axis=0)
+        jobs.checkpoint((i + STFT_BATCH) / len(starts))
+    magnitude = np.sqrt(power / len(starts))
+    return Spectrum(1.0 / (block * dt), _one_sided(magnitude, block, 1.0 / window.sum()), None, n, block, len(starts))
+
+def fourier_resample(x, step, spectrum=None):
+    """
+    Resamples `x` onto a grid `step` input samples apart in the frequency domain: the padded
+    rfft is truncated (which also removes what would alias) or zero-extended, then inverted at
+    the new length. Returns (output samples per input sample, output samples). A cached
+    Spectrum of `x` with coefficients saves the forward transform.
+    """
+    from scipy import fft as sp_fft
+    if spectrum is not None and spectrum.coefficients is not None and spectrum.n == len(x):
+        coefficients, n_fft = spectrum.coefficients, spectrum.n_fft
+    else:
+        n_fft = sp_fft.next_fast_len(len(x), real=True)
+        coefficients = sp_fft.rfft(x, n=n_fft, workers=FFT_WORKERS)
+    m_fft = max(2, int(round(n_fft / step)))
+    resized = np.zeros(m_fft // 2 + 1, dtype=coefficients.dtype)
+    keep = min(len(coefficients), len(resized))
+    resized[:keep] = coefficients[:keep]
+    ratio = m_fft / n_fft
+    y = sp_fft.irfft(resized, n=m_fft, workers=FFT_WORKERS)
+    y *= ratio
+    return ratio, y[:int(np.ceil(len(x) * ratio))]
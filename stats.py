@@ -0,0 +1,78 @@
+import numpy as np
+import jobs
+
+# This file contains the single-pass statistics engine used by Signal.calculate_stats.
+
+CHUNK_SIZE = 65536 # Samples per block; keeps each block's temporaries cache-sized
+
+class RunningStats:
+    """
+    Accumulates count, min, max, mean and the centred sum of squares (Welford/Chan)
+    over blocks of samples, so statistics can be built from chunks or streams.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, block):
+        """Folds a block of samples into the running statistics."""
+        block = np.asarray(block, dtype=float)
+        if block.size == 0:
+            return self
+        block_mean = block.mean()
+        deviation = block - block_mean
+        other = RunningStats()
+        other.count, other.mean, other.m2 = block.size, block_mean, float(np.dot(deviation, deviation))
+        other.min, other.max = block.min(), block.max()
+        return self.merge(other)
+
+    def merge(self, other):
+        """Combines another accumulator into this one (Chan et al. parallel update)."""
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def sum_sq(self):
+        """Sum of squared samples, i.e. the discrete energy."""
+        return self.m2 + self.count * self.mean ** 2
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def rms(self):
+        return np.sqrt(self.sum_sq / self.count) if self.count else np.nan
+
+def compute_stats(x, chunk_size=CHUNK_SIZE):
+    """Runs a RunningStats accumulator over `x` in cache-sized chunks."""
+    running = RunningStats()
+    for i in range(0, len(x), chunk_size):
+        running.update(x[i:i + chunk_size])
+        jobs.checkpoint((i + chunk_size) / len(x))
+    return running
+
+def summarize(running, is_discrete, dt, duration):
+    """
+    Turns an accumulator into the numeric part of Signal.calculate_stats. Discrete energy is
+    the plain sum of squares; continuous energy approximates the integral with step `dt`.
+    """
+    energy = running.sum_sq if is_discrete else running.sum_sq * dt
+    return {
+        'Max': float(running.max),
+        'Min': float(running.min),
+        'Mean': float(running.mean),
+        'RMS': float(running.rms),
+        'Energy': float(energy),
+        'Power': float(energy / duration) if duration > 0 else None,
+    }
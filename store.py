@@ -0,0 +1,204 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from cache import make_key
+
+# This file contains the server-side signal store. Sessions keep only a handle in
+# st.session_state; the arrays live here, once per distinct signal, and are shared by every
+# session holding the same content. Resident arrays, including the pyramid and spectrum caches
+# built on stored signals, are bounded by a global byte budget:
+# idle sessions' signals, and beyond the budget the least recently used ones, are spilled to
+# .npy files on local disk, held as memory maps and read back into memory on the next access.
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get('WAVESCALER_STORE_BYTES', 512 * 1024 * 1024))
+IDLE_SECONDS = float(os.environ.get('WAVESCALER_STORE_IDLE_SECONDS', 300)) # A session unused this long has its signals spilled
+EXPIRE_SECONDS = float(os.environ.get('WAVESCALER_STORE_EXPIRE_SECONDS', 6 * 3600)) # ... and this long, its handles dropped
+SPILL_DIR = os.environ.get('WAVESCALER_SPILL_DIR') # Defaults to a temporary directory removed at exit
+
+class _Entry:
+    """One stored signal and the sessions referencing it."""
+    __slots__ = ('handle', 'signal', 'sessions', 'paths', 'resident', 'spilling')
+
+    def __init__(self, handle, signal_obj):
+        self.handle = handle
+        self.signal = signal_obj
+        self.sessions = {} # session id -> time of last access
+        self.paths = None # (x path, t path or None) once the arrays are on disk
+        self.resident = True
+        self.spilling = False # Being written to disk outside the store's lock
+
+    @property
+    def nbytes(self):
+        """The signal's arrays plus the pyramid and spectrum caches built on it since it was stored."""
+        return self.signal.nbytes + self.signal.cache_nbytes
+
+    def last_access(self):
+        return max(self.sessions.values())
+
+class SignalStore:
+    """
+    A thread-safe, deduplicating store of materialized Signals addressed by content handles.
+    Handles are reference-counted per session; a signal no session references is deleted.
+    """
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES, spill_dir=SPILL_DIR, idle_seconds=IDLE_SECONDS, expire_seconds=EXPIRE_SECONDS):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.expire_seconds = expire_seconds
+        self.spills = self.faults = 0
+        self._spill_dir = spill_dir
+        self._entries = {} # handle -> _Entry
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Resident bytes. Caches grow after a signal is stored, so this is summed rather than kept as a counter."""
+        return sum(e.nbytes for e in self._entries.values() if e.resident)
+
+    def put(self, signal_obj, session):
+        """Stores a signal for `session` and returns its handle. Identical signals share one entry."""
+        signal_obj.x # Apply any deferred scaling before hashing
+        handle = make_key(signal_obj.fingerprint(), signal_obj.f, signal_obj.lazy)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                # Detached from any lazy source, so the store holds only this signal's arrays
+                entry = self._entries[handle] = _Entry(handle, signal_obj.with_arrays())
+            elif not entry.resident:
+                # The caller already has the samples in memory, so adopt them instead of reading the spill file
+                entry.signal, entry.resident = signal_obj.with_arrays(), True
+            entry.sessions[session] = now
+            victims = self._maintain(now, keep=entry)
+        self._spill(victims)
+        return handle
+
+    def get(self, handle, session):
+        """Returns the signal behind `handle`, reading it back if it was spilled, or None for an unknown handle."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            entry.sessions[session] = now
+            if not entry.resident:
+                self._fault_in(entry)
+            signal_obj = entry.signal
+            victims = self._maintain(now, keep=entry)
+        self._spill(victims)
+        return signal_obj
+
+    def release(self, handle, session):
+        """Drops the session's reference to `handle`; the last reference deletes the signal and its spill files."""
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                entry.sessions.pop(session, None)
+                if not entry.sessions:
+                    self._drop(entry)
+
+    def usage(self):
+        """Returns counters for the debug panel: entries, resident and spilled bytes, spills and faults."""
+        with self._lock:
+            spilled = sum(e.signal.nbytes for e in self._entries.values() if not e.resident)
+            return {'entries': len(self._entries), 'resident_bytes': self.nbytes, 'spilled_bytes': spilled,
+                    'spills': self.spills, 'faults': self.faults}
+
+    def __contains__(self, handle):
+        return handle in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Eviction ---
+    # Victims are chosen under the lock but written to disk after it is released, so one
+    # session's spill never blocks the others' reads; _spill re-checks each entry afterwards.
+    def _maintain(self, now, keep=None):
+        """
+        Forgets expired sessions and picks the signals to spill: idle ones, then least recently
+        used ones until within budget. Returns them as (entry, signal, time) for _spill.
+        """
+        victims = []
+        for entry in list(self._entries.values()):
+            for session, seen in list(entry.sessions.items()):
+                if now - seen > self.expire_seconds:
+                    del entry.sessions[session]
+            if not entry.sessions:
+                self._drop(entry)
+            elif entry.resident and not entry.spilling and entry is not keep and now - entry.last_access() > self.idle_seconds:
+                victims.append(entry)
+        resident = sum(e.nbytes for e in self._entries.values() if e.resident and not e.spilling and e not in victims)
+        if resident > self.max_bytes:
+            candidates = (e for e in self._entries.values() if e.resident and not e.spilling and e is not keep and e not in victims)
+            for entry in sorted(candidates, key=_Entry.last_access):
+                if resident <= self.max_bytes:
+                    break
+                victims.append(entry)
+                resident -= entry.nbytes
+        if victims:
+            self._directory()
+        for entry in victims:
+            entry.spilling = True
+        return [(entry, entry.signal, now) for entry in victims]
+
+    def _directory(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='wavescaler-spill-')
+            atexit.register(shutil.rmtree, self._spill_dir, True)
+        else:
+            os.makedirs(self._spill_dir, exist_ok=True)
+        return self._spill_dir
+
+    def _spill(self, victims):
+        """
+        Writes each victim's arrays to disk (once; stored signals never change) without holding
+        the lock, then swaps them for memory maps, which also drops the signal's derived caches.
+        An entry used or replaced while it was written stays resident; a dropped one loses its files.
+        """
+        for entry, signal_obj, chosen in victims:
+            paths = entry.paths
+            if paths is None:
+                base = os.path.join(self._spill_dir, entry.handle)
+                paths = (base + '.x.npy', None if signal_obj.is_compact else base + '.t.npy')
+                np.save(paths[0], signal_obj.x)
+                if paths[1] is not None:
+                    np.save(paths[1], signal_obj.t)
+            with self._lock:
+                entry.spilling = False
+                if entry.signal is None: # Dropped while writing
+                    _remove(paths)
+                    continue
+                entry.paths = paths
+                if entry.signal is not signal_obj or not entry.resident or entry.last_access() > chosen:
+                    continue
+                x_path, t_path = paths
+                entry.signal = signal_obj.with_arrays(np.load(x_path, mmap_mode='r'), None if t_path is None else np.load(t_path, mmap_mode='r'))
+                entry.resident = False
+                self.spills += 1
+
+    def _fault_in(self, entry):
+        """Reads a spilled entry's memory-mapped arrays back into memory."""
+        signal_obj = entry.signal
+        entry.signal = signal_obj.with_arrays(np.array(signal_obj.x), None if signal_obj.is_compact else np.array(signal_obj.t))
+        entry.resident = True
+        self.faults += 1
+
+    def _drop(self, entry):
+        del self._entries[entry.handle]
+        entry.signal = None
+        if not entry.spilling: # Otherwise _spill removes the files it is writing
+            _remove(entry.paths or ())
+
+def _remove(paths):
+    for path in paths:
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass # Still mapped by a caller (Windows); removed with the spill directory at exit
+
+# Shared by every session in this server process
+SIGNAL_STORE = SignalStore()
@@ -0,0 +1,127 @@
+import numpy as np
+from signal_generation import WAVEFORMS, iter_signal_blocks, sample_grid, BLOCK_SIZE
+from resampling import StreamResampler
+from stats import RunningStats, summarize
+import export
+
+# This file contains the streaming counterpart of Signal for signals too long to hold in memory.
+# A SignalStream only knows its length and sample spacing; its samples are regenerated block
+# by block on every pass, and scaling wraps the block source instead of touching any data.
+
+class SignalStream:
+    """
+    A uniformly sampled signal produced as blocks of samples. `source(block_size)` must return
+    a fresh iterator of sample blocks each time it is called, so the stream can be read more
+    than once (e.g. once for the peak and once to write a normalized WAV).
+    """
+    def __init__(self, source, num_samples, dt, is_discrete, f=None, Fs=None, t0=0.0, dtype=float):
+        self.source = source
+        self.num_samples = num_samples
+        self.dt = dt
+        self.is_discrete = is_discrete
+        self.f = f
+        self.Fs = Fs
+        self.t0 = t0
+        self.dtype = np.dtype(dtype)
+
+    @classmethod
+    def generate(cls, sig_type, A, f, phi, Fs, duration=2.0, max_points=None, dtype=float):
+        """Streams a registered waveform; see signal_generation.iter_signal_blocks."""
+        if sig_type not in WAVEFORMS:
+            raise ValueError(f"'{sig_type}' is not a generated waveform.")
+        num_samples, dt, is_discrete = sample_grid(sig_type, f, Fs, duration, max_points)
+        def source(block_size):
+            for _, x in iter_signal_blocks(sig_type, A, f, phi, Fs, duration, block_size, max_points, dtype):
+                yield x
+        return cls(source, num_samples, dt, is_discrete, f=f, Fs=Fs, dtype=dtype)
+
+    def _derive(self, source, num_samples=None, dt=None, f=None):
+        """Returns a stream with the same metadata apart from the given fields."""
+        return SignalStream(source, self.num_samples if num_samples is None else num_samples, self.dt if dt is None else dt,
+                            self.is_discrete, f=self.f if f is None else f, Fs=self.Fs, t0=self.t0, dtype=self.dtype)
+
+    def iter_blocks(self, chunk_size=BLOCK_SIZE):
+        """Yields (t, x) blocks like Signal.iter_blocks, building each time block from the sample index."""
+        start = 0
+        for x in self.source(chunk_size):
+            yield self.t0 + np.arange(start, start + len(x)) * self.dt, x
+            start += len(x)
+
+    def scale_amplitude(self, factor):
+        """
+        Performs amplitude scaling.
+        Returns a new SignalStream that multiplies each block as it is read.
+        """
+        def source(block_size):
+            for x in self.source(block_size):
+                yield x * factor
+        return self._derive(source)
+
+    def scale_time(self, factor):
+        """
+        Performs time scaling with the same sample layout as Signal.scale_time in 'linear' mode.
+        Discrete streams keep their sample spacing and are resampled to int(n / factor) samples
+        through a StreamResampler; continuous streams keep their samples and compress the time axis.
+        """
+        if factor == 1.0 or self.num_samples < 2:
+            return self._derive(self.source)
+        f = self.f * factor if self.f else self.f
+        duration = (self.num_samples - 1) * self.dt
+        if not self.is_discrete:
+            return self._derive(self.source, dt=self.dt / factor, f=f)
+
+        num_out = int(self.num_samples / factor)
+        if num_out < 2:
+            def source(block_size):
+                yield next(iter(self.source(block_size)))[:1]
+            return self._derive(source, num_samples=1, f=f)
+
+        def source(block_size):
+            resampler = StreamResampler(self.num_samples, num_out)
+            pending = []
+            for x in self.source(block_size):
+                y = resampler.process(x)
+                if len(y):
+                    pending.append(y)
+                # Re-chunk the resampler output so blocks stay near `block_size`
+                if sum(map(len, pending)) >= block_size:
+                    yield np.concatenate(pending)
+                    pending = []
+            if pending:
+                yield np.concatenate(pending)
+        return self._derive(source, num_samples=num_out, dt=(duration / factor) / (num_out - 1), f=f)
+
+    def running_stats(self, chunk_size=BLOCK_SIZE):
+        """Accumulates a RunningStats over one pass of the stream."""
+        running = RunningStats()
+        for x in self.source(chunk_size):
+            running.update(x)
+        return running
+
+    def calculate_stats(self, chunk_size=BLOCK_SIZE):
+        """Returns the same dictionary as Signal.calculate_stats, computed in one pass over the blocks."""
+        if self.num_samples == 0:
+            return {'Max': None, 'Min': None, 'Mean': None, 'RMS': None, 'Power': None, 'Energy': None, 'Period': None, 'Classification': None}
+        duration = (self.num_samples - 1) * self.dt if self.num_samples > 1 else 1.0
+        stats = summarize(self.running_stats(chunk_size), self.is_discrete, self.dt if self.num_samples > 1 else 1.0, duration)
+        stats['Period'] = 1 / self.f if self.f and self.f > 0 else None
+        stats['Classification'] = "Discrete" if self.is_discrete else "Continuous"
+        return stats
+
+    def export(self, fmt, fh, chunk_size=BLOCK_SIZE):
+        """
+        Streams the signal to `fh` in one of export.FORMATS. WAV files are written at the
+        stream's own sampling rate; 16-bit WAV takes an extra pass to find the peak.
+        """
+        if fmt == 'CSV':
+            export.write_csv_blocks(self.iter_blocks(chunk_size), fh)
+        elif fmt == 'NPY':
+            export.write_npy_blocks(self.iter_blocks(chunk_size), fh, self.num_samples, self.dtype)
+        elif fmt == 'WAV (float32)':
+            export.write_wav_float32_blocks(self.iter_blocks(chunk_size), fh, self.Fs, self.num_samples)
+        elif fmt == 'WAV (16-bit)':
+            running = self.running_stats(chunk_size)
+            peak = max(abs(running.min), abs(running.max)) if running.count else 0
+            export.write_wav_int16_blocks(self.iter_blocks(chunk_size), fh, self.Fs, self.num_samples, peak)
+        else:
+            raise ValueError(f"Unknown export format '{fmt}'. Choose from {list(export.FORMATS)}.")
@@ -0,0 +1,150 @@
+"""
+Lightweight per-rerun tracing for the app's hot paths.
+
+Spans are recorded only while a trace is active for the current thread (one Streamlit
+session's script run); otherwise span() returns a shared no-op object. Finished reruns are
+appended to a JSON-lines file, which can be summarized per stage with:
+
+    python tracing.py wavescaler_trace.jsonl
+    python tracing.py wavescaler_trace.jsonl --budget-ms 150    # exit 1 if the p99 rerun is slower
+
+Environment variables: WAVESCALER_TRACE=1 enables tracing for every session (a session can
+also opt in with ?debug=1), WAVESCALER_TRACE_FILE sets the log path and
+WAVESCALER_TRACE_MEMORY=1 also records allocations through tracemalloc (slower).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import numpy as np
+
+ENABLED = os.environ.get('WAVESCALER_TRACE', '') not in ('', '0')
+TRACE_FILE = os.environ.get('WAVESCALER_TRACE_FILE', 'wavescaler_trace.jsonl')
+TRACE_MEMORY = os.environ.get('WAVESCALER_TRACE_MEMORY', '') not in ('', '0')
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+class _NullSpan:
+    """Stand-in returned while tracing is off; every operation is a no-op."""
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def set(self, **attrs):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """Wall time, allocations and attributes (such as array sizes) of one stage."""
+    __slots__ = ('name', 'attrs', 'start', 'seconds', 'net_bytes', 'peak_bytes', '_memory_start')
+
+    def __init__(self, name, attrs):
+        self.name, self.attrs = name, attrs
+        self.seconds = self.net_bytes = self.peak_bytes = None
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.net_bytes, self.peak_bytes = current - self._memory_start, peak - self._memory_start
+        return False
+
+    def set(self, **attrs):
+        """Adds attributes, e.g. sizes that are only known inside the span."""
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {'name': self.name, 'seconds': self.seconds, 'net_bytes': self.net_bytes, 'peak_bytes': self.peak_bytes, **self.attrs}
+
+class Trace:
+    """The spans recorded during one script rerun."""
+    def __init__(self, session):
+        self.session = session
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def to_dict(self):
+        return {'ts': self.started, 'session': self.session, 'rerun_seconds': time.perf_counter() - self.start,
+                'spans': [s.to_dict() for s in self.spans]}
+
+def span(name, **attrs):
+    """Returns a context manager timing `name` in the current rerun, or a no-op when not tracing."""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _NULL_SPAN
+    new_span = Span(name, attrs)
+    trace.spans.append(new_span)
+    return new_span
+
+def record(name, seconds, **attrs):
+    """Adds a span measured elsewhere, such as a background job's run time, to the current rerun."""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        finished = Span(name, attrs)
+        finished.seconds = seconds
+        trace.spans.append(finished)
+
+def array_size(arr):
+    """Sample count of an optional array, for span attributes."""
+    return 0 if arr is None else len(arr)
+
+def begin_rerun(enabled=ENABLED, session=None):
+    """Starts a trace for this thread's rerun. A previous rerun cut short by st.rerun() is flushed first."""
+    end_rerun()
+    if enabled:
+        if TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _local.trace = Trace(session)
+
+def end_rerun():
+    """Finishes the current trace, appends it to TRACE_FILE and returns it (None when not tracing)."""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    if trace is None:
+        return None
+    record = trace.to_dict()
+    with _write_lock, open(TRACE_FILE, 'a') as fh:
+        fh.write(json.dumps(record) + '\n')
+    return record
+
+def summarize(path):
+    """Returns {stage: {'count', 'p50_ms', 'p99_ms'}} over every span in a trace log."""
+    durations = {'rerun': []}
+    with open(path) as fh:
+        for line in fh:
+            record = json.loads(line)
+            durations['rerun'].append(record['rerun_seconds'])
+            for s in record['spans']:
+                durations.setdefault(s['name'], []).append(s['seconds'])
+    return {name: {'count': len(values), 'p50_ms': 1e3 * float(np.percentile(values, 50)), 'p99_ms': 1e3 * float(np.percentile(values, 99))}
+            for name, values in durations.items() if values}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a WaveScaler trace log per stage.")
+    parser.add_argument('path', nargs='?', default=TRACE_FILE)
+    parser.add_argument('--budget-ms', type=float, default=None, help="Fail (exit 1) if the p99 rerun time exceeds this")
+    args = parser.parse_args(argv)
+
+    summary = summarize(args.path)
+    for stage, row in sorted(summary.items()):
+        print(f"{stage:<28}{row['count']:>8}  p50 {row['p50_ms']:>9.2f} ms  p99 {row['p99_ms']:>9.2f} ms")
+    if args.budget_ms is not None and 'rerun' in summary and summary['rerun']['p99_ms'] > args.budget_ms:
+        print(f"\np99 rerun {summary['rerun']['p99_ms']:.2f} ms exceeds the {args.budget_ms:.2f} ms budget")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
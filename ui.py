@@ -1,11 +1,8 @@
 import streamlit as st
-import pandas as pd
-import base64
 import numpy as np
-import sounddevice as sd
-from scipy.signal import resample
-from scipy.io import wavfile
-import io
+from functools import partial
+import export
+from resampling import MODES as RESAMPLE_MODES, DEFAULT_MODE
 
 # This file contains functions that draw UI elements.
 
@@ -113,6 +110,8 @@ def render_signal_generation_options(sig_type, on_change_callback, default_sampl
         params['custom_data'] = None
     else:
         params['custom_data'] = st.text_area("Custom Data", "1,2,3,2,1", key='custom_data', on_change=on_change_callback)
+        params['upload'] = st.file_uploader("Or load a recording (WAV, NPY, CSV or raw float32)", type=['wav', 'npy', 'csv', 'raw', 'bin', 'f32'],
+                                            key='upload', on_change=on_change_callback)
         params['A'], params['f'], params['phi'] = 1.0, 1.0, 0.0
 
     if 'Sampled' in sig_type or 'Discrete' in sig_type:
@@ -126,6 +125,10 @@ def render_scaling_options_and_buttons():
     """Renders the UI controls for scaling and the action buttons."""
     options = {}
     st.write("### Options")
+    # After Apply the factors are part of the current signal, so the controls start again from 1.0
+    if st.session_state.pop('reset_scaling_controls', False):
+        for key in ('amp_factor_slider', 'time_factor_slider', 'amp_factor_num', 'time_factor_num'):
+            st.session_state.pop(key, None)
     
     amp_s = st.slider("Amplitude Scaling Factor", 0.1, 5.0, 1.0, 0.1, key='amp_factor_slider')
     time_s = st.slider("Time Scaling Factor (a)", 0.2, 5.0, 1.0, 0.1, key='time_factor_slider')
@@ -136,6 +139,8 @@ def render_scaling_options_and_buttons():
             options['amp_scale_factor'] = st.number_input("Amplitude Factor", value=amp_s, min_value=0.1, max_value=5.0, step=0.01, key='amp_factor_num')
         with prec_s_col2:
             options['time_scale_factor'] = st.number_input("Time Factor", value=time_s, min_value=0.2, max_value=5.0, step=0.01, key='time_factor_num')
+        options['resample_mode'] = st.selectbox("Resampling Engine", list(RESAMPLE_MODES), index=list(RESAMPLE_MODES).index(DEFAULT_MODE), key='resample_mode',
+                                                help="linear: fastest; polyphase: band-limited, fast; sinc: most accurate, slowest; fft: frequency-domain, reuses the cached spectrum")
             
     b_col1, b_col2 = st.columns(2)
     options['apply_button'] = b_col1.button("Apply Scaling", use_container_width=True, type="primary")
@@ -143,9 +148,28 @@ def render_scaling_options_and_buttons():
     
     return options
 
+def render_view_window(signal_obj, key_prefix):
+    """Renders a time-window slider for zooming into the plot. Returns None for the full view."""
+    t_start, t_end, n = signal_obj.time_span() # Without building the time axis, which this runs on every rerun
+    if n < 2:
+        return None
+    t_start, t_end = float(t_start), float(t_end)
+    # The signal's span is part of the key so a rescaled signal starts from a fresh full view
+    window = st.slider("View Window (s)", t_start, t_end, (t_start, t_end), key=f"{key_prefix}_view_{t_end:.6g}")
+    return None if window == (t_start, t_end) else window
+
+def format_stats(stats):
+    """Formats the numeric statistics from Signal.calculate_stats for display."""
+    if stats.get('Classification') is None:
+        return {key: 'N/A' for key in stats}
+    formatted = {key: f"{value:.3f}" if value is not None else 'N/A' for key, value in stats.items() if key not in ('Period', 'Classification')}
+    formatted['Period'] = f"{stats['Period']:.3f} s" if stats['Period'] is not None else "Aperiodic"
+    formatted['Classification'] = stats['Classification']
+    return formatted
+
 def display_signal_properties(signal_obj):
     """Renders the signal properties using st.metric for a clean layout."""
-    stats = signal_obj.calculate_stats()
+    stats = format_stats(signal_obj.calculate_stats())
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Max", stats.get("Max", "N/A"))
@@ -159,34 +183,60 @@ def display_signal_properties(signal_obj):
         st.metric("Period", stats.get("Period", "N/A"))
         st.metric("Classification", stats.get("Classification", "N/A"))
 
-def get_download_links(signal_obj, key_prefix):
-    """Renders the download links for CSV and WAV."""
-    if signal_obj is not None and signal_obj.t is not None and signal_obj.x is not None:
+def get_download_links(signal_obj, key_prefix, samplerate):
+    """
+    Renders a download button for the chosen export format. The file is only serialized
+    when the button is clicked; 16-bit WAV files are rendered at `samplerate`.
+    """
+    if signal_obj is not None and signal_obj.x is not None and len(signal_obj.x) > 0:
         col1, col2 = st.columns(2)
-        df = pd.DataFrame({'time_s': signal_obj.t, 'amplitude': signal_obj.x})
-        csv = df.to_csv(index=False)
-        b64_csv = base64.b64encode(csv.encode()).decode()
-        col1.markdown(f'<a href="data:file/csv;base64,{b64_csv}" download="{key_prefix}_signal.csv" style="text-decoration:none;color:#0078FF;">Download CSV</a>', unsafe_allow_html=True)
-        
-        if signal_obj.is_discrete:
-            try:
-                audio_float = signal_obj.x.astype(np.float32)
-                max_val = np.max(np.abs(audio_float))
-                if max_val > 0: audio_float /= max_val
-                
-                source_fs = int(signal_obj.Fs)
-                device_info = sd.query_devices(sd.default.device[1], 'output')
-                target_fs = int(device_info['default_samplerate'])
-                
-                if source_fs != target_fs:
-                    num_samples = int(len(audio_float) * target_fs / source_fs)
-                    audio_float = resample(audio_float, num_samples)
-                
-                audio_int16 = (audio_float * 32767).astype(np.int16)
-                buffer = io.BytesIO()
-                wavfile.write(buffer, target_fs, audio_int16)
-                b64_wav = base64.b64encode(buffer.getvalue()).decode()
-                col2.markdown(f'<a href="data:audio/wav;base64,{b64_wav}" download="{key_prefix}_audio.wav" style="text-decoration:none;color:#0078FF;">Download WAV</a>', unsafe_allow_html=True)
-            except Exception:
-                pass
+        fmt = col1.selectbox("Export Format", export.available_formats(signal_obj), key=f"{key_prefix}_export_format", label_visibility="collapsed")
+        extension, mime, _ = export.FORMATS[fmt]
+        col2.download_button(f"Download {extension.upper()}", data=partial(export.export_bytes, signal_obj, fmt, samplerate),
+                             file_name=f"{key_prefix}_signal.{extension}", mime=mime, on_click="ignore",
+                             key=f"{key_prefix}_download", use_container_width=True)
+
+def render_sweep_options():
+    """
+    Renders the controls for overlaying a sweep of scaling factors on the current signal.
+    Returns (kind, factors), or None if the sweep is off or the factors are invalid.
+    """
+    col1, col2 = st.columns([1, 2])
+    kind = col1.selectbox("Sweep", ["Off", "Time factor", "Amplitude factor"], key='sweep_kind')
+    text = col2.text_input("Factors (comma-separated)", "0.5, 1, 2", key='sweep_factors')
+    if kind == "Off":
+        return None
+    try:
+        factors = [float(value) for value in text.split(',') if value.strip()]
+        if not factors or min(factors) <= 0: raise ValueError("factors must be positive")
+    except ValueError as e:
+        st.error(f"Invalid sweep factors. Error: {e}")
+        return None
+    return kind, tuple(factors)
+
+def display_bank_stats(bank):
+    """Renders one row of statistics per signal in a SignalBank."""
+    stats = bank.calculate_stats()
+    rows = [{'Signal': label, **{key: f"{values[i]:.3f}" if np.isfinite(values[i]) else 'N/A' for key, values in stats.items()}}
+            for i, label in enumerate(bank.labels)]
+    st.table(rows)
 
+def render_debug_panel(trace, store_usage=None, cache_usage=None):
+    """
+    Renders the per-stage timings recorded for this rerun (see tracing.py) and, if given, the
+    counters of the signal store and the result cache (SignalStore.usage, ResultCache.usage).
+    """
+    with st.expander(f"Debug: rerun timings ({trace['rerun_seconds'] * 1e3:.1f} ms)"):
+        rows = [{'stage': s['name'], 'ms': round(s['seconds'] * 1e3, 3),
+                 'peak KB': round(s['peak_bytes'] / 1e3, 1) if s['peak_bytes'] is not None else None,
+                 **{k: v for k, v in s.items() if k not in ('name', 'seconds', 'net_bytes', 'peak_bytes')}}
+                for s in trace['spans']]
+        st.table(rows)
+        if store_usage is not None:
+            st.caption(f"Signal store: {store_usage['entries']} signals, {store_usage['resident_bytes'] / 1e6:.1f} MB resident, "
+                       f"{store_usage['spilled_bytes'] / 1e6:.1f} MB spilled · {store_usage['spills']} spills, {store_usage['faults']} faults")
+        if cache_usage is not None:
+            lookups = cache_usage['hits'] + cache_usage['misses']
+            hit_rate = f"{100 * cache_usage['hits'] / lookups:.0f}% hits" if lookups else "no lookups"
+            st.caption(f"Result cache: {cache_usage['entries']} entries, {cache_usage['bytes'] / 1e6:.1f} MB · "
+                       f"{cache_usage['hits']} hits, {cache_usage['misses']} misses ({hit_rate})")